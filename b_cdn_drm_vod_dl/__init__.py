@@ -1,17 +1,55 @@
 import os
 import subprocess
+import sys
+
+from .hls import HLSDownloader, SEGMENT_CONCURRENCY
+
+# "native": in-process 병렬 세그먼트 다운로더, "yt-dlp": 외부 프로세스
+BACKENDS = ("native", "yt-dlp")
+DEFAULT_BACKEND = "native"
+
 
 class BunnyVideoDRM:
-    def __init__(self, referer, m3u8_url, name, path):
+    def __init__(self, referer, m3u8_url, name, path, backend=DEFAULT_BACKEND,
+                 segment_concurrency=SEGMENT_CONCURRENCY, log=None, mirrors=None, video_key=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"unknown backend: {backend}")
         self.referer = referer
         self.m3u8_url = m3u8_url
         self.name = name
         self.path = path
+        self.backend = backend
+        self.segment_concurrency = segment_concurrency
+        # 진행 메시지를 쓸 text stream. 작업별 StringIO를 넘기면 sys.stdout을 바꾸지 않고 thread별로 모을 수 있다
+        self.log = log
+        # 같은 영상을 제공하는 다른 CDN host. 세그먼트를 나눠 받고 느린 요청을 hedge 한다
+        self.mirrors = mirrors or []
+        # segment cache에서 이 영상의 세그먼트를 묶는 key (완성 후 discard_video로 지운다)
+        self.video_key = video_key
+
+    def _print(self, *args):
+        print(*args, file=self.log or sys.stdout)
 
     def download(self):
         os.makedirs(self.path, exist_ok=True)
         output_path = os.path.join(self.path, f"{self.name}.mp4")
+        if self.backend == "yt-dlp":
+            self._download_ytdlp(output_path)
+        else:
+            self._download_native(output_path)
+
+    def _download_native(self, output_path):
+        headers = {"User-Agent": "Mozilla/5.0", "Referer": self.referer}
+        self._print(f"[INFO] Native HLS download ({self.segment_concurrency} segments in parallel):")
+        self._print(self.m3u8_url)
+        try:
+            HLSDownloader(self.m3u8_url, headers, concurrency=self.segment_concurrency,
+                          mirrors=self.mirrors, video_key=self.video_key).download(output_path)
+            self._print(f"[SUCCESS] Download completed: {output_path}")
+        except Exception as e:
+            self._print(f"[ERROR] native HLS download failed: {e}")
 
+    def _download_ytdlp(self, output_path):
         cmd = [
             "yt-dlp",
             "-f", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best",  # 최고 화질 선택
@@ -21,11 +59,16 @@ class BunnyVideoDRM:
             self.m3u8_url
         ]
 
-        print(f"[INFO] Running yt-dlp command:")
-        print(" ".join(cmd))
+        self._print(f"[INFO] Running yt-dlp command:")
+        self._print(" ".join(cmd))
 
         try:
-            subprocess.run(cmd, check=True)
-            print(f"[SUCCESS] Download completed: {output_path}")
+            if self.log is None:
+                subprocess.run(cmd, check=True)
+            else:
+                result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+                self.log.write(result.stdout)
+                result.check_returncode()
+            self._print(f"[SUCCESS] Download completed: {output_path}")
         except subprocess.CalledProcessError as e:
-            print(f"[ERROR] yt-dlp failed: {e}")
+            self._print(f"[ERROR] yt-dlp failed: {e}")
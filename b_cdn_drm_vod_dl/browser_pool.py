@@ -0,0 +1,132 @@
+import atexit
+import itertools
+import json
+import subprocess
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+# 동시에 열어 두는 page 수 (같은 브라우저 context를 공유)
+BROWSER_PAGES = 2
+# 요청 하나(challenge 통과 포함) 최대 대기 시간 (초)
+BROWSER_TIMEOUT = 60
+# 브라우저 실행 대기 시간 (초)
+STARTUP_TIMEOUT = 60
+
+
+class BrowserError(Exception):
+    """browser worker를 띄우지 못했거나 요청이 실패함"""
+
+
+class BrowserPool:
+    """
+    `node cand.js --serve`로 띄운 headless 브라우저 하나에 page 여러 개를 유지하고,
+    JSON lines(stdin/stdout)로 요청을 보낸다. 요청마다 브라우저를 새로 띄우지 않으므로
+    한 번 Cloudflare challenge를 통과하면 이후 요청은 page 이동 비용만 든다.
+    여러 thread에서 같이 불러도 되고, worker가 죽으면 다음 요청에서 다시 띄운다.
+
+        pool = BrowserPool("cand.js", user_agent=UA)
+        res = pool.fetch(url, referer)   # {"status", "body", "cookies"}
+    """
+
+    def __init__(self, script: str, pages: int = BROWSER_PAGES, user_agent: str = None,
+                 timeout: float = BROWSER_TIMEOUT, node: str = "node"):
+        self.script = script
+        self.pages = max(1, pages)
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.node = node
+        self._proc = None
+        self._pending = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _start(self) -> subprocess.Popen:
+        cmd = [self.node, self.script, "--serve", "--pages", str(self.pages),
+               "--timeout", str(int(self.timeout * 1000))]
+        if self.user_agent:
+            cmd += ["--user-agent", self.user_agent]
+        try:
+            proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, text=True, encoding="utf-8", bufsize=1)
+        except OSError as e:
+            raise BrowserError(f"cannot start browser worker: {e}") from e
+        ready = Future()
+        threading.Thread(target=self._read, args=(proc, ready), name="browser-pool", daemon=True).start()
+        try:
+            ready.result(timeout=STARTUP_TIMEOUT)
+        except Exception as e:
+            proc.kill()
+            raise BrowserError(f"browser worker did not start: {e}") from e
+        return proc
+
+    def _read(self, proc: subprocess.Popen, ready: Future) -> None:
+        for line in proc.stdout:
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            if msg.get("ready"):
+                ready.set_result(True)
+                continue
+            with self._lock:
+                future = self._pending.pop(msg.get("id"), None)
+            if future is not None:
+                future.set_result(msg)
+        # worker 종료: 기다리던 요청은 모두 실패 처리
+        if not ready.done():
+            ready.set_exception(BrowserError(f"exited with code {proc.wait()}"))
+        with self._lock:
+            if self._proc is proc:
+                self._proc = None
+            pending = [f for f in self._pending.values()]
+            self._pending.clear()
+        for future in pending:
+            future.set_exception(BrowserError("browser worker exited"))
+
+    def fetch(self, url: str, referer: str = None) -> dict:
+        """url을 브라우저로 열어 challenge를 통과한 응답: {"status", "body", "cookies"}"""
+        with self._lock:
+            if self._proc is None:
+                self._proc = self._start()
+            request_id = next(self._ids)
+            future = self._pending[request_id] = Future()
+            try:
+                self._proc.stdin.write(json.dumps({"id": request_id, "url": url, "referer": referer}) + "\n")
+                self._proc.stdin.flush()
+            except OSError as e:
+                self._pending.pop(request_id, None)
+                raise BrowserError(f"browser worker is not running: {e}") from e
+        try:
+            msg = future.result(timeout=self.timeout + 10)
+        except FutureTimeoutError as e:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            raise BrowserError(f"browser request timed out: {url}") from e
+        if "error" in msg:
+            raise BrowserError(msg["error"])
+        return msg
+
+    def close(self) -> None:
+        with self._lock:
+            proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+            proc.wait(timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            proc.kill()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool(script: str, pages: int = BROWSER_PAGES, user_agent: str = None) -> BrowserPool:
+    """프로세스 전체에서 공유하는 BrowserPool (처음 fetch 때 브라우저를 띄우고 종료 시 닫는다)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(script, pages=pages, user_agent=user_agent)
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,5 @@
+CDN_URL_TEMPLATE = "https://{prefix}.b-cdn.net/{path}"
+
+
+def cdn_url(prefix: str, path: str) -> str:
+    return CDN_URL_TEMPLATE.format(prefix=prefix, path=path)
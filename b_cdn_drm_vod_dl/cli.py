@@ -0,0 +1,105 @@
+import argparse
+import os
+import sys
+import time
+
+from .config import Profile
+from .core import Pipeline, get_video_uuid
+from .daemon import DEFAULT_ADDRESS, JobServer, serve
+from .engine import FINALIZE_WORKERS, DownloadEngine
+from .jobs import JOBS_DB_PATH, WATCH_INTERVAL, JobStore, process_queue, split_urls, take_watched_files, urls_from_files
+from .metrics import METRICS
+from .scheduling import POLICIES
+from .ratelimit import LIMITER, parse_rate
+from .segcache import configure_segment_cache
+
+
+def print_results(results: list) -> None:
+    print("\n=== Results ===")
+    for r in results:
+        if r["success"]:
+            print(f"[OK] {r['name']} (via {r['source']})")
+        else:
+            print(f"[FAIL] {r['name']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bunny CDN batch downloader")
+    parser.add_argument("urls", nargs="*", help="영상 URL")
+    parser.add_argument("-f", "--file", action="append", default=[], help="URL 목록 파일 (여러 번 지정 가능)")
+    parser.add_argument("-o", "--output", help="저장 폴더 (기본: profile의 output_dir)")
+    parser.add_argument("--temp-dir", help="중간 파일 폴더 (기본: profile의 temp_dir)")
+    parser.add_argument("-j", "--workers", type=int, help="동시 다운로드 영상 수")
+    parser.add_argument("--mux-workers", type=int, default=FINALIZE_WORKERS,
+                        help=f"다운로드와 별도로 mux/이동을 하는 worker 수 (기본: {FINALIZE_WORKERS})")
+    parser.add_argument("--schedule", choices=POLICIES,
+                        help="다운로드 순서: fifo(입력 순서), sjf(작은 영상 먼저), fair(sjf + 오래 기다린 영상 우선)")
+    parser.add_argument("--watch", metavar="DIR", help="DIR에 들어오는 *.txt의 URL을 계속 처리")
+    parser.add_argument("--serve", metavar="ADDR", nargs="?", const=DEFAULT_ADDRESS,
+                        help=f"상주 모드: HOST:PORT 또는 Unix socket 경로로 작업 API 제공 (기본: {DEFAULT_ADDRESS})")
+    parser.add_argument("--db", default=JOBS_DB_PATH, help="작업 상태 SQLite 경로")
+    parser.add_argument("--metrics", metavar="FILE", help="단계별 측정값을 JSON lines로 기록할 파일")
+    parser.add_argument("--max-rate", metavar="RATE", help="전체 다운로드 속도 상한 (예: 500K, 8M)")
+    parser.add_argument("--host-rps", type=float, help="CDN host당 초당 요청 수 상한")
+    parser.add_argument("--no-segment-cache", action="store_true", help="HLS 세그먼트 디스크 캐시를 쓰지 않음")
+    return parser.parse_args(argv)
+
+
+def main(profile: Profile, argv=None) -> None:
+    """run.py / auto.py / win.py 공통 진입점"""
+    args = parse_args(argv)
+    profile = profile.with_overrides(output_dir=args.output, temp_dir=args.temp_dir, max_workers=args.workers,
+                                     schedule=args.schedule)
+    pipeline = Pipeline(profile)
+    if args.metrics:
+        METRICS.configure(args.metrics)
+    if args.no_segment_cache:
+        configure_segment_cache(False)
+    LIMITER.configure(requests_per_host=args.host_rps,
+                      bytes_per_second=parse_rate(args.max_rate) if args.max_rate else None)
+    urls = args.urls + urls_from_files(args.file)
+    if not urls and not args.watch and not args.serve:
+        if sys.stdin.isatty():
+            urls = split_urls(input("Enter URLs (space/comma-separated):\n"))
+        else:
+            urls = split_urls(sys.stdin.read())
+
+    # 중간에 죽었던 작업은 이어서, 이미 받은 영상은 건너뛴다
+    store = JobStore(args.db)
+    store.resume()
+    for u in urls:
+        store.add(u, get_video_uuid(u))
+    # 다시 받을 작업이 없는 영상의 중간 파일(이전 실행이 남긴 .part 등)은 지운다
+    pipeline.clean_staging({job["video_id"] for job in store.queued()})
+    # 제목 조회/다운로드는 전역 스케줄러에서 coroutine으로 진행 (host/세그먼트 동시성은 전역 설정)
+    engine = DownloadEngine(max_jobs=profile.max_workers, finalize_workers=args.mux_workers, policy=profile.schedule)
+
+    if args.serve:
+        # 작업마다 프로세스를 새로 띄우지 않고 session/cache/worker pool을 유지한 채 API로 작업을 받는다
+        serve(JobServer(store, engine, pipeline.build_video_info, pipeline.download_video, pipeline.output_path,
+                        job_key=get_video_uuid), args.serve)
+        return
+
+    def run_queue():
+        return process_queue(store, engine, pipeline.build_video_info, pipeline.download_video, pipeline.output_path)
+
+    if args.watch:
+        os.makedirs(args.watch, exist_ok=True)
+        print(f"Watching {args.watch} for *.txt URL lists (Ctrl+C to stop)")
+        try:
+            while True:
+                for u in take_watched_files(args.watch):
+                    store.add(u, get_video_uuid(u))
+                results = run_queue()
+                if results:
+                    print_results(results)
+                    METRICS.print_summary()
+                time.sleep(WATCH_INTERVAL)
+        except KeyboardInterrupt:
+            return
+
+    if not store.queued():
+        print("No URLs provided." if not urls else "Nothing to download (already in the output folder).")
+        return
+    print_results(run_queue())
+    METRICS.print_summary()
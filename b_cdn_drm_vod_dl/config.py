@@ -0,0 +1,107 @@
+import os
+from dataclasses import dataclass, field, replace
+
+from .mux import STREAM_MUX_SUPPORTED
+
+# CDN prefixes
+PRIMARY_PREFIX = "vz-f9765c3e-82b"
+SECONDARY_PREFIX = "vz-bcc18906-38f"
+TERTIARY_PREFIX = "vz-b3fe6a46-b2b"
+QUATERNARY_PREFIX = "vz-40d00b68-e91"
+QUINARY_PREFIX = "vz-6b30db03-fbb"
+
+MP4_QUALITIES = ["play_720p.mp4", "play_480p.mp4", "play_360p.mp4", "play_240p.mp4"]
+VIDEO_RESOLUTIONS = ["2160p", "1440p", "1080p", "720p", "480p", "360p"]
+AUDIO_QUALITIES = ["256a", "192a", "128a", "96a"]
+
+TEMP_DIR = os.path.join(os.getcwd(), "downloads")
+ANDROID_DOWNLOAD_DIR = "/storage/emulated/0/Download"
+
+# fallback 단계: ("hls", prefix) | ("mp4", prefix[, qualities]) | ("advanced", prefix)
+FALLBACK_HLS = "hls"
+FALLBACK_MP4 = "mp4"
+FALLBACK_ADVANCED = "advanced"
+
+
+@dataclass
+class Profile:
+    """
+    다운로드 파이프라인 설정. run.py/auto.py/win.py는 각자의 Profile만 선언하고
+    같은 core.Pipeline과 cli.main을 쓴다.
+
+        PROFILE = Profile(output_dir=r"C:\\Downloads", probe_prefixes=None)
+    """
+    # 모든 prefix/variant 동시 probe 우선순위. None이면 probe 없이 fallback 순서대로 시도
+    probe_prefixes: list = field(default_factory=lambda: [
+        PRIMARY_PREFIX, SECONDARY_PREFIX, QUATERNARY_PREFIX, QUINARY_PREFIX, TERTIARY_PREFIX,
+    ])
+    fallback: list = field(default_factory=lambda: [
+        (FALLBACK_HLS, PRIMARY_PREFIX),
+        (FALLBACK_MP4, SECONDARY_PREFIX),
+        (FALLBACK_MP4, QUATERNARY_PREFIX),
+        (FALLBACK_MP4, QUINARY_PREFIX),
+        (FALLBACK_ADVANCED, TERTIARY_PREFIX),
+    ])
+    mp4_qualities: list = field(default_factory=lambda: list(MP4_QUALITIES))
+    video_resolutions: list = field(default_factory=lambda: list(VIDEO_RESOLUTIONS))
+    audio_qualities: list = field(default_factory=lambda: list(AUDIO_QUALITIES))
+    # advanced layout에서 prefix별 codec 폴더 ({codec}_{res}). 없으면 video/{res}
+    codecs: dict = field(default_factory=dict)
+
+    # 동시 영상 수 / play_*.mp4 구간 병렬 연결 수
+    max_workers: int = 3
+    mp4_connections: int = 4
+    # video/audio를 임시 파일 없이 pipe로 바로 ffmpeg에 넣어 합치기
+    stream_mux: bool = STREAM_MUX_SUPPORTED
+    # video/audio 합칠 때 ffmpeg에 추가로 넘길 인자 (-c copy 뒤)
+    merge_args: tuple = ()
+    # 합치기 전에 각 rendition의 init/첫 세그먼트로 codec·container·timescale 확인
+    preflight: bool = True
+    # 다운로드가 끝나면 slot을 놓고 mux/이동은 engine의 finalize pool에서 (네트워크와 디스크를 동시에 사용)
+    staged_finalize: bool = True
+    # 제목 조회 단계에서 경로와 예상 크기를 미리 구한다 (schedule 순서, 디스크 공간 확인에 사용)
+    estimate_size: bool = True
+    # 다운로드 순서: "fifo"(입력 순서) | "sjf"(작은 영상 먼저) | "fair"(sjf + 오래 기다린 영상 우선)
+    schedule: str = "sjf"
+
+    # master playlist rendition 선택 정책 (None = 제한 없음)
+    max_height: int = None
+    preferred_codec: str = None  # "avc1", "hvc1", "vp09", "av01"
+    max_bandwidth: int = None
+
+    # 제목 조회: "api"는 pd-ing JSON API, "html"은 페이지 <title>
+    title_source: str = "api"
+    # 제목을 못 찾았을 때 쓸 이름. None이면 해당 URL은 실패 처리
+    title_fallback: str = "video_fallback"
+
+    temp_dir: str = TEMP_DIR
+    output_dir: str = ANDROID_DOWNLOAD_DIR
+
+    def video_layouts(self, prefix: str) -> list:
+        """prefix의 advanced (codec, resolution) 후보. codec None은 video/{res} 경로"""
+        return [(codec, res) for codec in self.codecs.get(prefix, [None]) for res in self.video_resolutions]
+
+    def with_overrides(self, **overrides) -> "Profile":
+        """값이 None이 아닌 항목만 바꾼 사본 (CLI 옵션 적용용)"""
+        return replace(self, **{k: v for k, v in overrides.items() if v is not None})
+
+
+# run.py / auto.py (Termux)
+ANDROID_PROFILE = Profile()
+
+# win.py: probe 없이 playlist → 720p mp4 → advanced 3개 prefix 순서, vp9/av1 layout 탐색
+WINDOWS_PROFILE = Profile(
+    probe_prefixes=None,
+    fallback=[
+        (FALLBACK_HLS, PRIMARY_PREFIX),
+        (FALLBACK_MP4, SECONDARY_PREFIX, ["play_720p.mp4"]),
+        (FALLBACK_ADVANCED, TERTIARY_PREFIX),
+        (FALLBACK_ADVANCED, QUATERNARY_PREFIX),
+        (FALLBACK_ADVANCED, QUINARY_PREFIX),
+    ],
+    codecs={QUATERNARY_PREFIX: ["vp9", "av1"], QUINARY_PREFIX: ["vp9", "av1"]},
+    merge_args=("-bsf:a", "aac_adtstoasc"),
+    title_source="html",
+    title_fallback=None,
+    output_dir=r"C:\Users\USER\Downloads\PDing1-main\downloads",
+)
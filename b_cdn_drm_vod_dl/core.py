@@ -0,0 +1,614 @@
+import io
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from . import BunnyVideoDRM
+from .cdn import cdn_url
+from .config import FALLBACK_ADVANCED, FALLBACK_HLS, FALLBACK_MP4, Profile
+from .metadata import cached_title, clean_title, fetch_api_title
+from .metrics import METRICS
+from .mux import stream_mux
+from .naming import NAMES, record_owner, sanitize_filename
+from .output import move_file, staging_dir
+from .preflight import PreflightError, preflight_pair
+from .ranged import download_ranged
+from .ratelimit import Throttled, is_throttled
+from .renditions import pick_from_master
+from .resolver import FOUND, THROTTLED, probe_url, resolve_route
+from .route_cache import default_cache
+from .scheduling import disk_shortfall
+from .segcache import default_segment_cache
+from .session import get_session
+from .sizing import file_size, hls_size
+
+# 작업 폴더를 지울 때도 남겨 두는 파일: download_ranged가 다음 실행에서 이어받는 .part와 진행 sidecar
+RESUMABLE_SUFFIXES = (".part", ".part.progress")
+
+# 이보다 오래 손대지 않은 작업 폴더는 이어받을 작업이 없는 것으로 보고 지운다 (초)
+STALE_WORK_DIR_AGE = 7 * 24 * 3600
+
+# 이 프로세스에서 사용 중인 작업 폴더 (같은 영상이 동시에 두 번 돌 때 폴더를 나눈다)
+_work_dirs = set()
+_work_dirs_lock = threading.Lock()
+
+
+def get_video_uuid(url: str) -> str:
+    m = re.search(r"v=([a-f0-9\-]+)", url)
+    return m.group(1) if m else None
+
+
+def fetch_page_title(url: str) -> str:
+    resp = get_session().get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
+    resp.raise_for_status()
+    m = re.search(r"<title[^>]*>(.*?)</title>", resp.text, re.IGNORECASE | re.DOTALL)
+    if not m:
+        raise ValueError("Page title not found")
+    return clean_title(m.group(1))
+
+
+def _last_error(buf: io.StringIO) -> str:
+    """숨긴 BunnyVideoDRM 출력에서 마지막 [ERROR] 줄"""
+    errors = [line for line in buf.getvalue().splitlines() if line.startswith("[ERROR]")]
+    return errors[-1] if errors else "output file missing"
+
+
+def _ordered(items: list, first) -> list:
+    """first부터 시작하는 목록 (first가 없으면 전체)"""
+    return items[items.index(first):] if first in items else items
+
+
+def _first(items: list, first) -> list:
+    """first를 맨 앞으로 옮긴 목록 (나머지 순서 유지)"""
+    return [first] + [i for i in items if i != first] if first is not None else items
+
+
+def _probed_route(probed: dict) -> dict:
+    """resolve_route 결과 → attempt_route가 받는 route dict"""
+    return {"prefix": probed["prefix"], "layout": probed["kind"],
+            "resolution": None if probed["kind"] == "hls" else probed["variant"]}
+
+
+def _clear_work_dir(path: str) -> None:
+    """이어받을 수 있는 range 다운로드만 남기고 작업 폴더를 비운다 (남는 게 없으면 폴더도 지운다)"""
+    try:
+        entries = os.listdir(path)
+    except OSError:
+        return
+    for entry in entries:
+        full = os.path.join(path, entry)
+        if os.path.isdir(full):
+            shutil.rmtree(full, ignore_errors=True)
+        elif not entry.endswith(RESUMABLE_SUFFIXES):
+            os.remove(full)
+    if not os.listdir(path):
+        os.rmdir(path)
+
+
+def _discard_work_dir(path: str) -> None:
+    """더 이어받지 않을 작업 폴더를 지운다 (지금 다른 작업이 쓰고 있으면 그대로 둔다)"""
+    with _work_dirs_lock:
+        if path in _work_dirs:
+            return
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _last_modified(path: str) -> float:
+    """폴더와 그 안 파일 중 가장 최근 수정 시각"""
+    times = [os.path.getmtime(path)]
+    for entry in os.listdir(path):
+        try:
+            times.append(os.path.getmtime(os.path.join(path, entry)))
+        except OSError:
+            pass
+    return max(times)
+
+
+def _allocated_parts(path: str) -> int:
+    """작업 폴더에 이어받으려고 남겨 둔 .part가 이미 차지한 디스크 공간 (bytes)"""
+    total = 0
+    try:
+        entries = os.listdir(path)
+    except OSError:
+        return 0
+    for entry in entries:
+        if not entry.endswith(".part"):
+            continue
+        try:
+            st = os.stat(os.path.join(path, entry))
+        except OSError:
+            continue
+        # download_ranged는 전체 크기를 미리 잡아 두므로 실제 할당량(st_blocks)을 센다
+        total += st.st_blocks * 512 if hasattr(st, "st_blocks") else st.st_size
+    return total
+
+
+def _report(info: dict, state: str) -> None:
+    """작업 큐에서 실행 중이면 진행 상태 전달"""
+    on_state = info.get("on_state")
+    if on_state:
+        on_state(state)
+
+
+class Pipeline:
+    """
+    영상 하나를 받는 단계들: 제목 조회(build_video_info) → 경로 결정(route cache, probe,
+    fallback) → 다운로드(hls / mp4 / advanced) → mux → 목적지로 이동.
+    prefix, 화질, fallback 순서, 폴더 등은 모두 Profile에서 읽는다.
+
+        pipeline = Pipeline(ANDROID_PROFILE)
+        engine.run_batch(urls, pipeline.build_video_info, pipeline.download_video)
+    """
+
+    def __init__(self, profile: Profile):
+        self.profile = profile
+
+    # --- 제목 ---
+
+    def fetch_title(self, url: str) -> str:
+        p = self.profile
+        vid = get_video_uuid(url)
+        if p.title_source == "api" and vid:
+            fetch = lambda: fetch_api_title(vid, url)
+        else:
+            fetch = lambda: fetch_page_title(url)
+        try:
+            title = cached_title(vid, fetch) if vid else fetch()
+            if not title:
+                raise ValueError("Title not found")
+            return title
+        except Exception:
+            if p.title_fallback is None:
+                raise
+            # 제목을 모르는 영상끼리 같은 파일을 덮어쓰지 않도록 video id를 붙인다
+            return f"{p.title_fallback}_{vid}" if vid else p.title_fallback
+
+    def build_video_info(self, url: str) -> dict:
+        vid = get_video_uuid(url)
+        if not vid:
+            raise ValueError(f"video_id not found in URL: {url}")
+        with METRICS.stage("title", video_id=vid):
+            name = NAMES.claim(sanitize_filename(self.fetch_title(url)), vid, self.profile.output_dir)
+        info = {"referer": url, "video_id": vid, "name": name}
+        if self.profile.estimate_size:
+            self.plan(info)
+        return info
+
+    # --- 예상 크기 ---
+
+    def plan(self, info: dict) -> None:
+        """
+        다운로드 전에 경로(route cache 또는 probe)와 예상 크기를 정해 info에 둔다.
+        engine은 info["size"]로 순서를, info["footprint"]로 디스크 공간을 확인하고,
+        probe 결과(info["probed"])는 다운로드 단계에서 다시 probe 하지 않고 쓴다.
+        """
+        p = self.profile
+        vid = info['video_id']
+        route = default_cache().get(vid)
+        if route is None and p.probe_prefixes:
+            try:
+                info["probed"] = self._probe(info)
+            except Throttled:
+                # 크기는 모르는 채로 두고 다운로드 단계에서 다시 probe 한다
+                return
+            route = info["probed"] and _probed_route(info["probed"])
+        if route is None:
+            return
+        headers = {"User-Agent": "Mozilla/5.0", "Referer": info['referer']}
+        with METRICS.stage("estimate", video_id=vid, prefix=route["prefix"]) as rec:
+            try:
+                size = self.estimate_size(vid, route, headers)
+            except Exception:
+                size = None
+            rec.update(ok=bool(size), estimated_bytes=size)
+        if size:
+            info["size"] = size
+            # 중간 파일은 항상 output_dir과 같은 파일시스템에 둔다 (staging_dir).
+            # 임시 파일로 합치는 advanced는 video/audio rendition과 합친 파일이 잠시 같이 있다
+            pair_on_disk = route["layout"] == "advanced" and not p.stream_mux
+            # 이전 실행이 남긴 .part는 이미 자리를 잡고 있으므로 새로 필요한 만큼만 센다
+            need = size * (2 if pair_on_disk else 1) - _allocated_parts(self._job_dir_path(info))
+            info["footprint"] = {p.output_dir: max(0, need)}
+
+    def estimate_size(self, vid: str, route: dict, headers: dict) -> int:
+        """route로 받게 될 영상의 예상 크기 (bytes, 모르면 None). segment cache는 자체 상한이 있어 제외"""
+        prefix, layout = route["prefix"], route["layout"]
+        if layout == "mp4":
+            return file_size(cdn_url(prefix, f"{vid}/{route.get('resolution') or self.profile.mp4_qualities[0]}"),
+                             headers)
+        if layout == "hls":
+            return hls_size(cdn_url(prefix, f"{vid}/playlist.m3u8"), headers)
+        # advanced: master playlist가 있으면 그 기준, 없으면 video rendition 기준 (audio는 작아서 제외)
+        try:
+            return hls_size(cdn_url(prefix, f"{vid}/playlist.m3u8"), headers)
+        except Exception:
+            if not route.get("resolution"):
+                raise
+        codec, res = route.get("codec"), route["resolution"]
+        rendition = f"{codec}_{res}" if codec else f"video/{res}"
+        return hls_size(cdn_url(prefix, f"{vid}/{rendition}/video.m3u8"), headers)
+
+    # --- 출력 ---
+
+    def output_path(self, info: dict) -> str:
+        return os.path.join(self.profile.output_dir, f"{info['name']}.mp4")
+
+    def _job_dir_path(self, info: dict) -> str:
+        staging = staging_dir(self.profile.output_dir, self.profile.temp_dir)
+        return os.path.join(staging, f"job-{info['video_id']}")
+
+    def job_dir(self, info: dict) -> str:
+        """
+        작업별 중간 파일 폴더 (staging 폴더 아래 video id 이름). output_dir과 같은 파일시스템이라
+        완료 후 이동이 rename으로 끝난다. 성공하면 통째로 지우고, 실패/중단되면 mp4 range 다운로드의
+        .part와 sidecar만 남겨 다음 실행이 같은 폴더에서 이어받는다. 이전 실행이 남긴 다른 파일은
+        완성본으로 오인하지 않도록 시작할 때 지운다.
+        """
+        if "work_dir" not in info:
+            path = self._job_dir_path(info)
+            with _work_dirs_lock:
+                if path in _work_dirs:
+                    # 같은 영상이 동시에 또 돌면 이어받기 없이 따로 받는다
+                    path = f"{path}-{uuid.uuid4().hex[:8]}"
+                _work_dirs.add(path)
+            if os.path.isdir(path):
+                _clear_work_dir(path)
+            os.makedirs(path, exist_ok=True)
+            info["work_dir"] = path
+        return info["work_dir"]
+
+    def move_to_output(self, src: str, name: str) -> None:
+        os.makedirs(self.profile.output_dir, exist_ok=True)
+        dst = os.path.join(self.profile.output_dir, f"{name}.mp4")
+        with METRICS.stage("move") as rec:
+            rec["bytes"] = move_file(src, dst)
+
+    def finalize(self, info: dict, step) -> None:
+        """
+        mux/이동처럼 네트워크를 쓰지 않는 마무리 작업. download_video가 staged로 실행 중이면
+        info에 쌓아 두었다가 engine의 finalize pool에서 실행하고, 아니면 바로 실행한다.
+        """
+        pending = info.get("pending")
+        if pending is None:
+            step()
+        else:
+            pending.append(step)
+
+    def mirror_hosts(self, info: dict, prefix: str) -> list:
+        """probe에서 같은 영상이 확인된 다른 prefix의 host (segment 분산/hedge용)"""
+        return [urlsplit(cdn_url(m, "")).netloc for m in info.get("mirrors", []) if m != prefix]
+
+    # --- 다운로드 단계 (성공 시 route dict, 실패 시 None) ---
+
+    def download_hls(self, info: dict, prefix: str) -> dict:
+        vid, name, referer = info['video_id'], info['name'], info['referer']
+        work_dir = self.job_dir(info)
+        temp_file = os.path.join(work_dir, "output.mp4")
+        try:
+            buf = io.StringIO()
+            with METRICS.stage("hls", prefix=prefix, video_id=vid) as rec:
+                BunnyVideoDRM(referer=referer, m3u8_url=cdn_url(prefix, f"{vid}/playlist.m3u8"),
+                              name="output", path=work_dir, log=buf,
+                              mirrors=self.mirror_hosts(info, prefix), video_key=vid).download()
+                if not os.path.exists(temp_file):
+                    rec.update(ok=False, error=_last_error(buf))
+            if os.path.exists(temp_file):
+                self.finalize(info, lambda: self.move_to_output(temp_file, name))
+                return {"prefix": prefix, "layout": "hls"}
+        except Exception:
+            pass
+        return None
+
+    def download_mp4(self, info: dict, prefix: str, qualities: list = None) -> dict:
+        vid, name = info['video_id'], info['name']
+        headers = {"User-Agent": "Mozilla/5.0", "Referer": info['referer']}
+        temp_file = os.path.join(self.job_dir(info), "output.mp4")
+        for q in qualities or self.profile.mp4_qualities:
+            try:
+                with METRICS.stage("mp4", prefix=prefix, video_id=vid, variant=q) as rec:
+                    rec["bytes"] = download_ranged(cdn_url(prefix, f"{vid}/{q}"), temp_file, headers,
+                                                   connections=self.profile.mp4_connections)
+                self.finalize(info, lambda: self.move_to_output(temp_file, name))
+                return {"prefix": prefix, "layout": "mp4", "resolution": q}
+            except Exception as e:
+                # throttle은 화질이 없다는 뜻이 아니므로 낮은 화질로 내려가지 않는다
+                if is_throttled(e):
+                    return None
+        return None
+
+    def download_pair(self, info: dict, video_m3u8: str, audio_m3u8: str) -> None:
+        """video/audio rendition 한 쌍을 받아 합친 뒤 output_dir에 저장. 실패 시 예외"""
+        p = self.profile
+        name, referer = info['name'], info['referer']
+        headers = {"User-Agent": "Mozilla/5.0", "Referer": referer}
+        tags = {"prefix": urlsplit(video_m3u8).hostname.split(".", 1)[0], "video_id": info['video_id']}
+        mirrors = self.mirror_hosts(info, tags["prefix"])
+        if p.preflight:
+            # init/첫 세그먼트만 받아 -c copy로 합칠 수 있는 조합인지 먼저 확인 (아니면 다음 후보로)
+            with METRICS.stage("preflight", **tags) as rec:
+                try:
+                    preflight_pair(video_m3u8, audio_m3u8, headers, info['video_id'])
+                except PreflightError as e:
+                    rec.update(ok=False, error=str(e))
+                    raise
+        if p.stream_mux:
+            _report(info, "muxing")
+            # 임시 파일 없이 pipe로 ffmpeg에 넣고 목적지에 바로 기록
+            with METRICS.stage("stream_mux", **tags):
+                stream_mux(video_m3u8, audio_m3u8, headers, self.output_path(info), extra_args=p.merge_args,
+                           mirrors=mirrors, video_key=info['video_id'])
+            return
+
+        work_dir = self.job_dir(info)
+        video_path = os.path.join(work_dir, "video.mp4")
+        audio_path = os.path.join(work_dir, "audio.mp4")
+        merged = os.path.join(work_dir, "output.mp4")
+
+        def remove_renditions():
+            for path in (video_path, audio_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        try:
+            buf = io.StringIO()
+            with METRICS.stage("renditions", **tags) as rec:
+                BunnyVideoDRM(referer=referer, m3u8_url=video_m3u8, name="video", path=work_dir, log=buf,
+                              mirrors=mirrors, video_key=info['video_id']).download()
+                BunnyVideoDRM(referer=referer, m3u8_url=audio_m3u8, name="audio", path=work_dir, log=buf,
+                              mirrors=mirrors, video_key=info['video_id']).download()
+                if not (os.path.exists(video_path) and os.path.exists(audio_path)):
+                    rec["error"] = _last_error(buf)
+                    raise FileNotFoundError(f"rendition download failed: {video_m3u8}, {audio_m3u8}")
+        except BaseException:
+            remove_renditions()
+            raise
+
+        # mux는 바로 한다: 실패하면 예외가 호출한 쪽 후보 loop로 돌아가 다음 음질/해상도/prefix를 시도한다.
+        # 목적지로 옮기는 것만 finalize 단계로 미룬다
+        try:
+            _report(info, "muxing")
+            with METRICS.stage("mux", **tags):
+                subprocess.run([
+                    "ffmpeg", "-i", video_path, "-i", audio_path, "-c", "copy", *p.merge_args, "-y", merged
+                ], check=True)
+        except BaseException:
+            if os.path.exists(merged):
+                os.remove(merged)
+            raise
+        finally:
+            remove_renditions()
+        self.finalize(info, lambda: self.move_to_output(merged, name))
+
+    def download_from_master(self, info: dict, prefix: str) -> dict:
+        """master playlist에서 실제 rendition을 읽고 정책에 맞는 것 하나만 받는다"""
+        p = self.profile
+        vid, name, referer = info['video_id'], info['name'], info['referer']
+        headers = {"User-Agent": "Mozilla/5.0", "Referer": referer}
+        with METRICS.stage("master", prefix=prefix, video_id=vid) as rec:
+            picked = pick_from_master(
+                cdn_url(prefix, f"{vid}/playlist.m3u8"), headers,
+                max_height=p.max_height, preferred_codec=p.preferred_codec, max_bandwidth=p.max_bandwidth,
+            )
+            rec["ok"] = bool(picked)
+        if not picked:
+            return None
+        try:
+            if picked["audio_url"]:
+                self.download_pair(info, picked["url"], picked["audio_url"])
+            else:
+                work_dir = self.job_dir(info)
+                BunnyVideoDRM(referer=referer, m3u8_url=picked["url"], name="output", path=work_dir,
+                              log=io.StringIO(), mirrors=self.mirror_hosts(info, prefix), video_key=vid).download()
+                temp_file = os.path.join(work_dir, "output.mp4")
+                if not os.path.exists(temp_file):
+                    return None
+                self.finalize(info, lambda: self.move_to_output(temp_file, name))
+        except Exception:
+            return None
+        # route의 codec은 {codec}_{res} 폴더 이름이다. master의 CODECS(avc1.640028 등)는 폴더와
+        # 관계가 없으므로 남기지 않는다 (다음 실행도 master에서 다시 고른다)
+        return {"prefix": prefix, "layout": "advanced", "codec": None,
+                "resolution": f"{picked['height']}p", "audio": picked["audio_name"]}
+
+    def download_advanced(self, info: dict, prefix: str, layouts: list = None,
+                          audio_qualities: list = None) -> dict:
+        """master playlist 우선, 없으면 (codec, 해상도) × 음질 조합을 순서대로 확인"""
+        won = self.download_from_master(info, prefix)
+        if won:
+            return won
+
+        vid = info['video_id']
+        headers = {"User-Agent": "Mozilla/5.0", "Referer": info['referer']}
+        for codec, res in layouts or self.profile.video_layouts(prefix):
+            rendition = f"{codec}_{res}" if codec else f"video/{res}"
+            video_m3u8 = cdn_url(prefix, f"{vid}/{rendition}/video.m3u8")
+            state = probe_url(video_m3u8, headers)
+            # throttle은 화질/음질이 없다는 뜻이 아니므로 낮은 조합으로 내려가지 않는다
+            if state == THROTTLED:
+                return None
+            if state != FOUND:
+                continue
+            for aq in audio_qualities or self.profile.audio_qualities:
+                audio_m3u8 = cdn_url(prefix, f"{vid}/audio/{aq}/audio.m3u8")
+                state = probe_url(audio_m3u8, headers)
+                if state == THROTTLED:
+                    return None
+                if state != FOUND:
+                    continue
+                try:
+                    self.download_pair(info, video_m3u8, audio_m3u8)
+                    return {"prefix": prefix, "layout": "advanced", "codec": codec, "resolution": res, "audio": aq}
+                except Exception:
+                    continue
+        return None
+
+    # --- 경로 결정 ---
+
+    def attempt_route(self, info: dict, route: dict) -> dict:
+        """캐시/probe가 알려준 경로를 먼저, 같은 prefix의 나머지 후보는 그 뒤에 시도"""
+        p = self.profile
+        prefix, layout = route["prefix"], route["layout"]
+        if layout == "hls":
+            return self.download_hls(info, prefix)
+        if layout == "mp4":
+            return self.download_mp4(info, prefix, _ordered(p.mp4_qualities, route.get("resolution")))
+        layouts = p.video_layouts(prefix)
+        if route.get("resolution"):
+            layouts = _first(layouts, (route.get("codec"), route["resolution"]))
+        return self.download_advanced(info, prefix, layouts, _first(p.audio_qualities, route.get("audio")))
+
+    def attempt_fallback(self, info: dict) -> dict:
+        for step in self.profile.fallback:
+            kind, prefix = step[0], step[1]
+            if kind == FALLBACK_HLS:
+                won = self.download_hls(info, prefix)
+            elif kind == FALLBACK_MP4:
+                won = self.download_mp4(info, prefix, step[2] if len(step) > 2 else None)
+            elif kind == FALLBACK_ADVANCED:
+                won = self.download_advanced(info, prefix)
+            else:
+                raise ValueError(f"unknown fallback step: {kind}")
+            if won:
+                return won
+        return None
+
+    def download_video(self, info: dict) -> dict:
+        """
+        profile.staged_finalize면 네트워크 단계만 여기서 끝내고, 남은 mux/이동은 결과의
+        "finalize" callable로 돌려준다 (DownloadEngine이 finalize pool에서 실행).
+        """
+        # 기다려도 공간이 생기지 않아 engine이 그대로 보낸 작업은 받기 전에 실패 처리
+        shortfall = info.get("disk_shortfall") or disk_shortfall(info.get("footprint"))
+        if shortfall:
+            return self._failed(info, {"name": info['referer'], "success": False, "source": None,
+                                       "error": shortfall})
+        if self.profile.staged_finalize:
+            info["pending"] = []
+        try:
+            with METRICS.stage("video", video_id=info['video_id']) as rec:
+                result = self._download_video(info)
+                rec.update(ok=result["success"], prefix=result["source"])
+        except BaseException:
+            self._cleanup(info, keep_resumable=True)
+            raise
+        if result["success"] and info.get("pending"):
+            result["finalize"] = lambda: self._finalize(info, result)
+            return result
+        if not result["success"]:
+            return self._failed(info, result)
+        self._completed(info)
+        self._cleanup(info)
+        return result
+
+    def _failed(self, info: dict, result: dict) -> dict:
+        """
+        실패한 작업은 이어받을 .part만 남긴다. 다시 시도하지 않기로 하면(작업 큐의 마지막 실패)
+        결과의 "discard" callable로 남긴 폴더까지 지운다.
+        """
+        path = info.get("work_dir") or self._job_dir_path(info)
+        self._cleanup(info, keep_resumable=True)
+        if os.path.isdir(path):
+            result["discard"] = lambda: _discard_work_dir(path)
+        return result
+
+    def clean_staging(self, keep: set = None, max_age: float = STALE_WORK_DIR_AGE) -> None:
+        """
+        이전 실행이 남긴 작업 폴더 정리. max_age보다 오래됐거나, keep(다시 받을 video id 목록)이
+        주어졌는데 거기에 없는 영상의 폴더는 지운다.
+        """
+        staging = staging_dir(self.profile.output_dir, self.profile.temp_dir)
+        now = time.time()
+        for entry in os.listdir(staging):
+            path = os.path.join(staging, entry)
+            if not entry.startswith("job-") or not os.path.isdir(path):
+                continue
+            # 동시 실행용 job-<video id>-<8자리> 폴더는 이어받지 않으므로 keep과 맞지 않아 지워진다
+            try:
+                stale = now - _last_modified(path) > max_age
+            except OSError:
+                continue
+            if stale or (keep is not None and entry[len("job-"):] not in keep):
+                _discard_work_dir(path)
+
+    def _finalize(self, info: dict, result: dict) -> dict:
+        try:
+            with METRICS.stage("finalize", video_id=info['video_id']):
+                for step in info["pending"]:
+                    step()
+                self._completed(info)
+        except Exception as e:
+            # 다운로드한 경로가 쓸 수 없는 결과였으므로 다음 실행에서 다시 고르게 한다
+            default_cache().invalidate(info['video_id'])
+            return dict(result, success=False, error=f"finalize: {e}")
+        finally:
+            self._cleanup(info)
+        return result
+
+    def _completed(self, info: dict) -> None:
+        """출력이 완성된 영상: 받은 video id를 기록하고, 다시 받을 일 없는 세그먼트를 캐시에서 지운다"""
+        record_owner(self.output_path(info), info['video_id'])
+        cache = default_segment_cache()
+        if cache:
+            cache.discard_video(info['video_id'])
+
+    def _cleanup(self, info: dict, keep_resumable: bool = False) -> None:
+        """작업 폴더 정리. keep_resumable이면 다음 실행이 이어받을 .part/sidecar는 남긴다"""
+        info.pop("pending", None)
+        if "work_dir" in info:
+            path = info.pop("work_dir")
+            if keep_resumable:
+                _clear_work_dir(path)
+            else:
+                shutil.rmtree(path, ignore_errors=True)
+            with _work_dirs_lock:
+                _work_dirs.discard(path)
+        NAMES.release(info['name'], info['video_id'])
+
+    def _probe(self, info: dict) -> dict:
+        p = self.profile
+        vid = info['video_id']
+        headers = {"User-Agent": "Mozilla/5.0", "Referer": info['referer']}
+        with METRICS.stage("probe", video_id=vid) as rec:
+            probed = resolve_route(vid, headers, p.probe_prefixes, p.mp4_qualities, p.video_resolutions)
+            rec.update(ok=bool(probed), prefix=probed and probed["prefix"], variant=probed and probed["variant"])
+        if probed:
+            # 같은 variant를 제공하는 다른 prefix에서도 세그먼트를 받는다
+            info["mirrors"] = probed.get("mirrors", [])
+        return probed
+
+    def _download_video(self, info: dict) -> dict:
+        p = self.profile
+        vid, referer = info['video_id'], info['referer']
+
+        cache = default_cache()
+        # 지난번에 성공한 경로를 먼저 시도
+        won = None
+        cached = cache.get(vid)
+        if cached:
+            won = self.attempt_route(info, cached)
+            if not won:
+                cache.invalidate(vid)
+
+        # 모든 prefix/variant를 동시에 probe 해서 응답한 경로로 바로 다운로드 (plan에서 probe 했으면 그 결과)
+        if not won and p.probe_prefixes:
+            try:
+                probed = info.pop("probed") if "probed" in info else self._probe(info)
+            except Throttled as e:
+                # 더 높은 우선순위 경로가 throttle 중이면 낮은 variant/fallback으로 내려가지 않고 실패로 끝낸다
+                return {"name": referer, "success": False, "source": None, "error": str(e)}
+            if probed:
+                won = self.attempt_route(info, _probed_route(probed))
+
+        # probe 실패 시 profile의 순차 fallback
+        if not won:
+            won = self.attempt_fallback(info)
+
+        if not won:
+            return {"name": referer, "success": False, "source": None}
+        cache.put(vid, won)
+        return {"name": referer, "success": True, "source": won["prefix"]}
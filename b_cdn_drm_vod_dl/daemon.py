@@ -0,0 +1,219 @@
+import http.server
+import json
+import os
+import re
+import signal
+import socket
+import socketserver
+import threading
+import time
+from urllib.parse import urlsplit
+
+from .jobs import JobStore, job_steps, split_urls
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+# 진행 상황 stream에서 job 상태를 확인하는 간격 (초)
+EVENT_POLL_INTERVAL = 0.5
+FINAL_STATES = ("done", "failed")
+
+
+class JobServer:
+    """
+    상주 다운로드 서비스. session/cache/worker pool을 유지한 채 HTTP 또는 Unix socket으로
+    작업을 받아 하나의 DownloadEngine(start() 상태)에서 바로 실행한다.
+
+        POST /jobs              {"urls": [...]} 또는 text/plain URL 목록 → 등록된 job 목록
+        GET  /jobs              최근 job 목록
+        GET  /jobs/{id}         job 상태
+        GET  /jobs/{id}/events  상태가 바뀔 때마다 JSON 한 줄 (done/failed에서 끝남)
+        POST /jobs/{id}/retry   failed job 다시 시도
+        GET  /health            상태별 job 수
+
+    curl --unix-socket ~/.cache/pding/pding.sock http://localhost/jobs -d "https://..."
+    """
+
+    def __init__(self, store: JobStore, engine, build_info, download, output_path, job_key=None):
+        self.store = store
+        self.engine = engine
+        self.job_key = job_key or (lambda url: None)
+        self._build, self._run = job_steps(store, build_info, download, output_path)
+        self._lock = threading.Lock()
+        self._active = set()
+
+    def start(self) -> None:
+        """engine을 띄우고 지난번에 끝나지 않은 작업을 다시 넣는다"""
+        self.engine.start()
+        self.store.resume()
+        for job in self.store.queued():
+            self._enqueue(job["id"])
+
+    def stop(self) -> None:
+        self.engine.stop()
+
+    def _enqueue(self, job_id: int) -> None:
+        with self._lock:
+            if job_id in self._active:
+                return
+            self._active.add(job_id)
+        future = self.engine.submit(job_id, self._build, self._run)
+        future.add_done_callback(lambda f: self._finished(job_id, f))
+
+    def _finished(self, job_id: int, future) -> None:
+        with self._lock:
+            self._active.discard(job_id)
+        if not future.cancelled() and future.exception() is None and future.result().get("retry"):
+            self._enqueue(job_id)
+
+    def submit(self, urls: list) -> list:
+        """URL을 등록하고 바로 engine에 넣는다. 이미 있는 URL은 기존 job을 돌려준다"""
+        jobs = []
+        for url in urls:
+            job_id = self.store.add(url, self.job_key(url))
+            if job_id is not None:
+                self._enqueue(job_id)
+                jobs.append(self.store.get(job_id))
+            else:
+                jobs.append(self.store.find(url) or {"url": url, "id": None, "state": "done"})
+        return jobs
+
+    def retry(self, job_id: int) -> bool:
+        if not self.store.retry(job_id):
+            return False
+        self._enqueue(job_id)
+        return True
+
+    def events(self, job_id: int):
+        """job 상태가 바뀔 때마다 yield. done/failed가 되면 끝난다"""
+        last = None
+        while True:
+            job = self.store.get(job_id)
+            if job is None:
+                return
+            if (job["state"], job["updated_at"]) != last:
+                last = (job["state"], job["updated_at"])
+                yield job
+            if job["state"] in FINAL_STATES:
+                return
+            time.sleep(EVENT_POLL_INTERVAL)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    server_version = "pding-daemon"
+
+    def log_message(self, format, *args):
+        pass
+
+    def address_string(self):
+        # Unix socket은 client_address가 빈 문자열
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _json(self, status: int, body) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_urls(self) -> list:
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode("utf-8")
+        if "json" in (self.headers.get("Content-Type") or "") or raw.lstrip().startswith("{"):
+            body = json.loads(raw)
+            return list(body.get("urls") or []) + ([body["url"]] if body.get("url") else [])
+        return split_urls(raw)
+
+    def do_GET(self):
+        jobs: JobServer = self.server.jobs
+        path = urlsplit(self.path).path.rstrip("/")
+        if path == "/health":
+            return self._json(200, {"counts": jobs.store.counts()})
+        if path == "/jobs":
+            return self._json(200, {"jobs": jobs.store.recent()})
+        m = re.fullmatch(r"/jobs/(\d+)(/events)?", path)
+        if not m:
+            return self._json(404, {"error": "not found"})
+        job_id = int(m.group(1))
+        job = jobs.store.get(job_id)
+        if job is None:
+            return self._json(404, {"error": f"no job {job_id}"})
+        if not m.group(2):
+            return self._json(200, job)
+        # 연결을 닫을 때까지 JSON lines로 진행 상황 전달
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            for event in jobs.events(job_id):
+                self.wfile.write(json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_POST(self):
+        jobs: JobServer = self.server.jobs
+        path = urlsplit(self.path).path.rstrip("/")
+        if path == "/jobs":
+            try:
+                urls = self._read_urls()
+            except (ValueError, AttributeError) as e:
+                return self._json(400, {"error": f"invalid body: {e}"})
+            if not urls:
+                return self._json(400, {"error": "no urls"})
+            return self._json(202, {"jobs": jobs.submit(urls)})
+        m = re.fullmatch(r"/jobs/(\d+)/retry", path)
+        if m:
+            if jobs.retry(int(m.group(1))):
+                return self._json(202, jobs.store.get(int(m.group(1))))
+            return self._json(409, {"error": "job is not failed"})
+        return self._json(404, {"error": "not found"})
+
+
+class _TCPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+
+# Windows CPython에는 AF_UNIX(UnixStreamServer)가 없다. 그때는 TCP 주소만 받는다
+if hasattr(socket, "AF_UNIX"):
+    class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+else:
+    _UnixServer = None
+
+
+def make_server(jobs: JobServer, address: str = DEFAULT_ADDRESS):
+    """address: "host:port" / "port"는 TCP, 경로("/" 포함)는 Unix socket"""
+    if "/" in address:
+        if _UnixServer is None:
+            raise OSError(f"Unix sockets are not supported on this platform; use HOST:PORT instead of {address}")
+        path = os.path.expanduser(address)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+        server = _UnixServer(path, _Handler)
+        os.chmod(path, 0o600)
+    else:
+        host, _, port = address.rpartition(":")
+        server = _TCPServer((host or "127.0.0.1", int(port)), _Handler)
+    server.jobs = jobs
+    return server
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve(jobs: JobServer, address: str = DEFAULT_ADDRESS) -> None:
+    """Ctrl+C(또는 SIGTERM)까지 요청을 받는다"""
+    server = make_server(jobs, address)
+    signal.signal(signal.SIGTERM, _interrupt)
+    jobs.start()
+    print(f"Serving jobs on {address} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if "/" in address and os.path.exists(os.path.expanduser(address)):
+            os.remove(os.path.expanduser(address))
+        jobs.stop()
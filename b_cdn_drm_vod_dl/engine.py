@@ -0,0 +1,146 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .hls import configure_segment_pool
+from .scheduling import DEFAULT_POLICY, DISK_HEADROOM, JobScheduler
+from .session import configure as configure_session
+
+# 동시에 진행하는 영상 수
+MAX_JOBS = 3
+# 동시에 진행하는 제목 조회 수
+METADATA_CONCURRENCY = 8
+# 모든 영상이 나눠 쓰는 세그먼트 동시 요청 수
+GLOBAL_SEGMENT_CONCURRENCY = 24
+# CDN host당 최대 연결 수
+PER_HOST_CONNECTIONS = 16
+# mux/이동(CPU·디스크) 단계 worker 수
+FINALIZE_WORKERS = 2
+# 다운로드는 끝났지만 mux/이동을 기다리는 영상 수 상한. 넘으면 다운로드 slot이 기다린다
+MAX_PENDING_FINALIZE = 4
+
+
+class DownloadEngine:
+    """
+    asyncio 기반 배치 스케줄러. 각 URL은 coroutine 하나로 metadata → download 단계를 거치고,
+    동시성은 영상 단위가 아니라 전역(job/metadata/segment)과 host 단위로 설정한다.
+    단계 함수(build_info, download)는 기존 blocking 함수를 그대로 쓰며 thread에서 실행된다.
+    download 결과에 "finalize" callable이 있으면 다운로드 slot을 놓고 별도 finalize pool에서
+    실행한 값을 최종 결과로 쓴다 (네트워크 단계와 mux/이동 단계 분리).
+    다운로드 slot은 policy(fifo/sjf/fair) 순서로 주고, info["footprint"]만큼 디스크가 남을 때만
+    작업을 시작한다 (scheduling.JobScheduler).
+
+        engine = DownloadEngine(max_jobs=6)
+        results = engine.run_batch(urls, build_video_info, download_video)
+    """
+
+    def __init__(self, max_jobs: int = MAX_JOBS, metadata_concurrency: int = METADATA_CONCURRENCY,
+                 segment_concurrency: int = GLOBAL_SEGMENT_CONCURRENCY,
+                 per_host_connections: int = PER_HOST_CONNECTIONS,
+                 finalize_workers: int = FINALIZE_WORKERS, max_pending_finalize: int = MAX_PENDING_FINALIZE,
+                 policy: str = DEFAULT_POLICY, disk_headroom: int = DISK_HEADROOM):
+        self.max_jobs = max_jobs
+        self.metadata_concurrency = metadata_concurrency
+        self.max_pending_finalize = max_pending_finalize
+        self.policy = policy
+        self.disk_headroom = disk_headroom
+        self._finalize_pool = ThreadPoolExecutor(max_workers=finalize_workers, thread_name_prefix="finalize")
+        self._loop = None
+        configure_session(per_host_connections)
+        configure_segment_pool(segment_concurrency)
+
+    def _scheduler(self) -> JobScheduler:
+        return JobScheduler(self.max_jobs, self.policy, self.disk_headroom)
+
+    async def run_job(self, url: str, build_info, download, job_slots: JobScheduler,
+                      metadata_slots: asyncio.Semaphore, finalize_slots: asyncio.Semaphore) -> dict:
+        loop = asyncio.get_running_loop()
+        try:
+            async with metadata_slots:
+                info = await loop.run_in_executor(None, build_info, url)
+        except Exception:
+            return {"name": url, "success": False, "source": None}
+        await job_slots.acquire(info)
+        try:
+            try:
+                result = await loop.run_in_executor(None, download, info)
+                finalize = result.pop("finalize", None) if isinstance(result, dict) else None
+                if finalize is None:
+                    return result
+                # mux/이동 대기열이 가득 차면 다운로드 slot을 쥔 채 기다린다 (임시 파일이 끝없이 쌓이지 않게)
+                await finalize_slots.acquire()
+            finally:
+                job_slots.release()
+            try:
+                return await loop.run_in_executor(self._finalize_pool, finalize)
+            finally:
+                finalize_slots.release()
+        finally:
+            # 중간 파일은 mux/이동까지 끝나야 정리되므로 디스크 몫은 여기서 돌려준다
+            job_slots.release_disk(info)
+
+    async def run(self, urls: list, build_info, download, on_result=None) -> list:
+        """완료 순서대로 결과를 모아 반환. on_result가 있으면 결과마다 호출"""
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.max_jobs + self.metadata_concurrency))
+        job_slots = self._scheduler()
+        metadata_slots = asyncio.Semaphore(self.metadata_concurrency)
+        finalize_slots = asyncio.Semaphore(self.max_pending_finalize)
+        tasks = [
+            asyncio.create_task(self.run_job(u, build_info, download, job_slots, metadata_slots, finalize_slots))
+            for u in urls
+        ]
+        results = []
+        for task in asyncio.as_completed(tasks):
+            result = await task
+            if on_result:
+                on_result(result)
+            results.append(result)
+        return results
+
+    def run_batch(self, urls: list, build_info, download, on_result=None) -> list:
+        return asyncio.run(self.run(urls, build_info, download, on_result))
+
+    # --- 상주 모드 (daemon) ---
+
+    def start(self) -> None:
+        """event loop를 별도 thread에서 계속 돌린다. 이후 submit()으로 작업을 하나씩 넣는다"""
+        loop = asyncio.new_event_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.max_jobs + self.metadata_concurrency))
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            self._job_slots = self._scheduler()
+            self._metadata_slots = asyncio.Semaphore(self.metadata_concurrency)
+            self._finalize_slots = asyncio.Semaphore(self.max_pending_finalize)
+            ready.set()
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="download-engine", daemon=True)
+        self._thread.start()
+        ready.wait()
+        self._loop = loop
+
+    def submit(self, url: str, build_info, download) -> Future:
+        """start()한 engine에 작업 하나를 넣는다. 결과는 concurrent.futures.Future로 받는다"""
+        if self._loop is None:
+            raise RuntimeError("engine is not started")
+        return asyncio.run_coroutine_threadsafe(
+            self.run_job(url, build_info, download, self._job_slots, self._metadata_slots, self._finalize_slots),
+            self._loop,
+        )
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+
+def finish(result: dict) -> dict:
+    """engine 없이 download를 직접 호출했을 때 남은 finalize 단계를 바로 실행"""
+    finalize = result.pop("finalize", None)
+    return finalize() if finalize else result
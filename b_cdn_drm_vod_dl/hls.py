@@ -0,0 +1,376 @@
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import m3u8
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+from .metrics import METRICS, retries_of
+from .ratelimit import LIMITER
+from .segcache import default_segment_cache, segment_key
+from .session import get_session
+
+SEGMENT_CONCURRENCY = 8
+SEGMENT_TIMEOUT = 15
+CHUNK_SIZE = 64 * 1024
+
+# 세그먼트 요청이 그 host의 최근 첫 응답(헤더) 시간 이 percentile을 넘기도록 응답이 없으면 다른 source로 중복 요청(hedge)
+HEDGE_PERCENTILE = 0.9
+# 이만큼 표본이 모이기 전에는 hedge하지 않는다
+HEDGE_MIN_SAMPLES = 8
+# hedge 기준 지연의 하한 (초). 빠른 CDN에서 불필요한 중복 요청 방지
+HEDGE_MIN_DELAY = 0.3
+HEDGE_WORKERS = 64
+
+
+class _Cancelled(Exception):
+    """다른 source가 먼저 도착해서 중단한 요청"""
+
+
+class LatencyTracker:
+    """
+    최근 세그먼트 요청의 첫 응답(헤더)까지 걸린 시간. hedge 기준 지연(percentile)을 계산한다.
+    body 전체 시간은 세그먼트 크기(init/audio/video)에 따라 달라 기준으로 쓰지 않는다.
+    """
+
+    def __init__(self, size: int = 256):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def threshold(self, percentile: float = HEDGE_PERCENTILE) -> float:
+        """hedge를 보낼 지연 (표본이 부족하면 None)"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(HEDGE_MIN_DELAY, samples[min(len(samples) - 1, int(len(samples) * percentile))])
+
+
+_latency = {}
+_latency_lock = threading.Lock()
+
+
+def host_latency(host: str) -> LatencyTracker:
+    """host별 LatencyTracker (edge마다 응답 시간이 달라 섞지 않는다)"""
+    with _latency_lock:
+        if host not in _latency:
+            _latency[host] = LatencyTracker()
+        return _latency[host]
+
+# 세그먼트 요청(원본 + hedge)을 실제로 보내는 thread. segment worker는 먼저 끝난 것을 기다린다
+_hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="segment-fetch")
+
+
+_segment_pool = None
+_segment_pool_lock = threading.Lock()
+
+
+def configure_segment_pool(workers: int) -> None:
+    """
+    프로세스 전체에서 공유하는 segment worker pool 설정. 동시 세그먼트 요청 수를
+    영상 단위가 아니라 전역으로 제한한다. 0 이하면 영상별 pool로 되돌린다.
+    """
+    global _segment_pool
+    with _segment_pool_lock:
+        old, _segment_pool = _segment_pool, (ThreadPoolExecutor(max_workers=workers) if workers > 0 else None)
+    if old is not None:
+        old.shutdown(wait=False)
+
+
+def _parse_byterange(value: str, last_end: int) -> tuple:
+    """'length[@offset]' → (start, end) inclusive. offset 생략 시 직전 구간 다음부터."""
+    length, _, offset = value.partition("@")
+    start = int(offset) if offset else last_end
+    return start, start + int(length) - 1
+
+
+class HLSDownloader:
+    """
+    m3u8을 직접 파싱해서 세그먼트를 병렬로 받아 순서대로 파일에 기록하는 in-process 엔진.
+    master playlist면 bandwidth가 가장 높은 variant를 선택한다.
+    세그먼트와 init section은 segment cache를 거치므로 재시도/재실행 시 다시 받지 않는다
+    video_key를 주면 캐시에 그 key로 묶어 두어, 출력이 완성된 뒤 호출한 쪽이 discard_video()로 지운다.
+
+    mirrors는 같은 영상을 제공하는 다른 CDN host 목록이다. playlist가 같은 것으로 확인된
+    mirror에 세그먼트를 번갈아 나눠 요청하고, 느린 세그먼트는 다른 source로 hedge 한다.
+    """
+
+    def __init__(self, m3u8_url: str, headers: dict, concurrency: int = SEGMENT_CONCURRENCY,
+                 timeout: float = SEGMENT_TIMEOUT, cache=None, mirrors: list = None, hedge: bool = True,
+                 video_key: str = None):
+        self.m3u8_url = m3u8_url
+        self.headers = headers
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.cache = cache if cache is not None else default_segment_cache()
+        self.mirrors = [m for m in mirrors or [] if m != urlsplit(m3u8_url).netloc]
+        self.hedge = hedge
+        self.video_key = video_key
+        self._keys = {}
+        self._media_url = None
+        self._sources = None
+        # 세그먼트는 pool thread에서 받으므로 생성한 thread의 stage에 합산
+        self._stage = METRICS.current_stage()
+
+    def _get(self, url: str, byterange: tuple = None, cancel: threading.Event = None, on_headers=None) -> bytes:
+        headers = dict(self.headers)
+        if byterange:
+            headers["Range"] = f"bytes={byterange[0]}-{byterange[1]}"
+        with get_session().get(url, headers=headers, timeout=self.timeout, stream=True) as resp:
+            METRICS.add(self._stage, requests=1, retries=retries_of(resp))
+            resp.raise_for_status()
+            if on_headers is not None:
+                on_headers()
+            chunks = []
+            for chunk in resp.iter_content(CHUNK_SIZE):
+                # 다른 source가 먼저 끝났으면 남은 body는 받지 않고 연결을 닫는다
+                if cancel is not None and cancel.is_set():
+                    raise _Cancelled(url)
+                chunks.append(chunk)
+        data = b"".join(chunks)
+        METRICS.add(self._stage, bytes=len(data))
+        LIMITER.consume_bytes(len(data))
+        return data
+
+    def _timed_get(self, url: str, byterange: tuple, cancel: threading.Event, started: threading.Event) -> bytes:
+        """응답 헤더가 오면 host의 첫 응답 시간을 기록하고 started를 알린다"""
+        tracker = host_latency(urlsplit(url).netloc)
+        start = time.monotonic()
+
+        def on_headers():
+            tracker.record(time.monotonic() - start)
+            started.set()
+
+        return self._get(url, byterange, cancel, on_headers)
+
+    def _candidates(self, url: str, index: int) -> list:
+        """세그먼트 하나를 받을 URL 순서. index로 mirror를 돌아가며 첫 source를 정한다"""
+        host = urlsplit(url).netloc
+        hosts = self._sources or [urlsplit(self.m3u8_url).netloc]
+        if host not in hosts:
+            urls = [url]
+        else:
+            first = index % len(hosts)
+            urls = [urlsplit(url)._replace(netloc=h).geturl() for h in hosts[first:] + hosts[:first]]
+        if self.hedge and len(urls) == 1:
+            urls.append(url)
+        return urls
+
+    def _fetch_hedged(self, url: str, byterange: tuple = None, index: int = 0) -> bytes:
+        """
+        담당 source에 요청하고, 그 host의 최근 첫 응답 시간 percentile이 지나도록 헤더조차 오지 않으면
+        다음 source로 중복 요청한다. 이미 body를 받고 있는 요청은 (크기 때문에 느려도) hedge 하지 않는다.
+        오류가 나면 바로 다음 source로 넘어간다. 먼저 도착한 응답을 쓰고 나머지는 중단한다.
+        """
+        remaining = deque(self._candidates(url, index))
+        tracker = host_latency(urlsplit(remaining[0]).netloc)
+        cancel = threading.Event()
+        started = threading.Event()
+        futures = set()
+        last_error = None
+
+        def launch():
+            futures.add(_hedge_pool.submit(self._timed_get, remaining.popleft(), byterange, cancel, started))
+
+        launch()
+        launched = time.monotonic()
+        try:
+            while futures:
+                timeout = None
+                if self.hedge and remaining and not started.is_set():
+                    threshold = tracker.threshold()
+                    # 표본이 모이기 전이나 헤더를 기다리는 동안은 주기적으로 다시 확인한다
+                    timeout = HEDGE_MIN_DELAY if threshold is None else \
+                        min(HEDGE_MIN_DELAY, launched + threshold - time.monotonic())
+                done, _ = wait(futures, timeout=max(0, timeout) if timeout is not None else None,
+                               return_when=FIRST_COMPLETED)
+                if not done:
+                    threshold = tracker.threshold()
+                    if not started.is_set() and threshold is not None and time.monotonic() - launched >= threshold:
+                        METRICS.add(self._stage, hedged=1)
+                        launch()
+                        launched = time.monotonic()
+                    continue
+                for future in done:
+                    futures.discard(future)
+                    if future.exception() is None:
+                        return future.result()
+                    last_error = future.exception()
+                    if remaining and not futures:
+                        launch()
+            raise last_error
+        finally:
+            cancel.set()
+            for future in futures:
+                future.cancel()
+
+    def _get_cached(self, url: str, byterange: tuple = None, index: int = 0) -> bytes:
+        """세그먼트 원본 바이트 (playlist/key는 바뀔 수 있으므로 캐시하지 않는다). 캐시 key는 원래 URL 기준"""
+        if not self.cache:
+            return self._fetch_hedged(url, byterange, index)
+        key = segment_key(url, byterange)
+        data = self.cache.get(key, self.video_key)
+        if data is not None:
+            METRICS.add(self._stage, cache_hits=1)
+            return data
+        data = self._fetch_hedged(url, byterange, index)
+        self.cache.put(key, data, self.video_key)
+        return data
+
+    def load_playlist(self, url: str = None) -> m3u8.M3U8:
+        url = url or self.m3u8_url
+        playlist = m3u8.loads(self._get(url).decode("utf-8"), uri=url)
+        if not playlist.is_variant:
+            self._media_url = url
+        return playlist
+
+    def _confirm_mirrors(self, playlist: m3u8.M3U8) -> None:
+        """같은 경로의 playlist가 같은 세그먼트 목록인 mirror만 source로 쓴다"""
+        own = urlsplit(self.m3u8_url).netloc
+        self._sources = [own]
+        if not self.mirrors or self._media_url is None or urlsplit(self._media_url).netloc != own:
+            return
+        expected = [(seg.uri, seg.duration, seg.byterange) for seg in playlist.segments]
+        for host in self.mirrors:
+            try:
+                text = self._get(urlsplit(self._media_url)._replace(netloc=host).geturl()).decode("utf-8")
+            except Exception:
+                continue
+            if [(seg.uri, seg.duration, seg.byterange) for seg in m3u8.loads(text).segments] == expected:
+                self._sources.append(host)
+
+    def select_variant(self, master: m3u8.M3U8) -> tuple:
+        """(video playlist url, 별도 audio playlist url 또는 None)"""
+        best = max(master.playlists, key=lambda p: p.stream_info.bandwidth or 0)
+        audio_url = None
+        for media in best.media:
+            if media.type == "AUDIO" and media.uri:
+                audio_url = media.absolute_uri
+                break
+        return best.absolute_uri, audio_url
+
+    def _decrypt(self, data: bytes, key, sequence: int) -> bytes:
+        if key is None or key.method in (None, "NONE"):
+            return data
+        if key.method != "AES-128":
+            raise ValueError(f"unsupported HLS encryption: {key.method}")
+        if key.absolute_uri not in self._keys:
+            self._keys[key.absolute_uri] = self._get(key.absolute_uri)
+        iv = bytes.fromhex(key.iv[2:].zfill(32)) if key.iv else sequence.to_bytes(16, "big")
+        decryptor = Cipher(algorithms.AES(self._keys[key.absolute_uri]), modes.CBC(iv)).decryptor()
+        plain = decryptor.update(data) + decryptor.finalize()
+        return plain[:-plain[-1]] if plain else plain
+
+    def _jobs(self, playlist: m3u8.M3U8) -> list:
+        """세그먼트별 (url, byterange, key, sequence, init_section) 목록"""
+        jobs = []
+        last_end = {}
+        for i, seg in enumerate(playlist.segments):
+            byterange = None
+            if seg.byterange:
+                byterange = _parse_byterange(seg.byterange, last_end.get(seg.absolute_uri, 0))
+                last_end[seg.absolute_uri] = byterange[1] + 1
+            jobs.append((seg.absolute_uri, byterange, seg.key, playlist.media_sequence + i, seg.init_section))
+        return jobs
+
+    def _fetch_segment(self, job: tuple) -> bytes:
+        url, byterange, key, sequence, _ = job
+        return self._decrypt(self._get_cached(url, byterange, sequence), key, sequence)
+
+    def _fetch_init(self, init_section) -> bytes:
+        byterange = _parse_byterange(init_section.byterange, 0) if init_section.byterange else None
+        return self._get_cached(init_section.absolute_uri, byterange)
+
+    def first_chunk(self, playlist: m3u8.M3U8) -> bytes:
+        """init section(EXT-X-MAP), 없으면 복호화한 첫 세그먼트. 전체를 받기 전 내용 확인용"""
+        jobs = self._jobs(playlist)
+        if not jobs:
+            raise ValueError(f"empty media playlist: {self.m3u8_url}")
+        if jobs[0][4] is not None:
+            return self._fetch_init(jobs[0][4])
+        return self._fetch_segment(jobs[0])
+
+    def write_to(self, fp, playlist: m3u8.M3U8) -> int:
+        """media playlist 세그먼트를 병렬로 받아 순서대로 fp에 기록. 기록한 바이트 수 반환."""
+        jobs = self._jobs(playlist)
+        if self._sources is None:
+            self._confirm_mirrors(playlist)
+        written = 0
+        current_init = None
+        window = self.concurrency * 2
+        # 공유 pool이 설정돼 있으면 전체 영상이 같은 segment worker를 나눠 쓴다
+        shared = _segment_pool
+        executor = shared or ThreadPoolExecutor(max_workers=self.concurrency)
+        pending = deque()
+        next_job = 0
+        try:
+            while next_job < len(jobs) or pending:
+                while next_job < len(jobs) and len(pending) < window:
+                    pending.append((jobs[next_job], executor.submit(self._fetch_segment, jobs[next_job])))
+                    next_job += 1
+                job, future = pending.popleft()
+                init_section = job[4]
+                if init_section is not None and init_section.absolute_uri != current_init:
+                    data = self._fetch_init(init_section)
+                    fp.write(data)
+                    written += len(data)
+                    current_init = init_section.absolute_uri
+                data = future.result()
+                fp.write(data)
+                written += len(data)
+        finally:
+            for _, future in pending:
+                future.cancel()
+            if shared is None:
+                executor.shutdown()
+        return written
+
+    def save(self, playlist: m3u8.M3U8, output_path: str) -> int:
+        """.part에 기록 후 완료 시에만 rename"""
+        part = output_path + ".part"
+        try:
+            with open(part, "wb") as f:
+                written = self.write_to(f, playlist)
+            os.replace(part, output_path)
+        except BaseException:
+            if os.path.exists(part):
+                os.remove(part)
+            raise
+        return written
+
+    def download_playlist(self, url: str, output_path: str) -> int:
+        return self.save(self.load_playlist(url), output_path)
+
+    def download(self, output_path: str) -> int:
+        playlist = self.load_playlist()
+        if not playlist.is_variant:
+            return self.save(playlist, output_path)
+
+        video_url, audio_url = self.select_variant(playlist)
+        if not audio_url:
+            return self.download_playlist(video_url, output_path)
+
+        video_path = output_path + ".video"
+        audio_path = output_path + ".audio"
+        part = output_path + ".part"
+        try:
+            written = self.download_playlist(video_url, video_path)
+            written += self.download_playlist(audio_url, audio_path)
+            subprocess.run([
+                "ffmpeg", "-loglevel", "error", "-i", video_path, "-i", audio_path,
+                "-map", "0:v", "-map", "1:a", "-c", "copy", "-f", "mp4", "-y", part
+            ], check=True)
+            os.replace(part, output_path)
+        finally:
+            for path in (video_path, audio_path, part):
+                if os.path.exists(path):
+                    os.remove(path)
+        return written
@@ -0,0 +1,237 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from .naming import NAMES, owned_by
+
+JOBS_DB_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pding", "jobs.sqlite3")
+JOB_STATES = ("queued", "resolving", "downloading", "muxing", "done", "failed")
+# 재시작 시 queued로 되돌릴 진행 중 상태
+ACTIVE_STATES = ("resolving", "downloading", "muxing")
+MAX_ATTEMPTS = 3
+WATCH_INTERVAL = 5
+
+
+def split_urls(raw: str) -> list:
+    return [u for u in re.split(r"[\s,;]+", raw) if u]
+
+
+def urls_from_files(paths: list) -> list:
+    urls = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            urls.extend(split_urls(f.read()))
+    return urls
+
+
+def take_watched_files(directory: str) -> list:
+    """watch 디렉터리의 *.txt에서 URL을 읽고, 읽은 파일은 *.txt.done으로 바꾼다"""
+    urls = []
+    for entry in sorted(os.listdir(directory)):
+        path = os.path.join(directory, entry)
+        if not entry.endswith(".txt") or not os.path.isfile(path):
+            continue
+        urls.extend(urls_from_files([path]))
+        os.replace(path, path + ".done")
+    return urls
+
+
+class JobStore:
+    """
+    URL 단위 작업 상태를 SQLite에 저장한다. 중간에 죽어도 다시 실행하면 resume()으로
+    진행 중이던 작업을 queued로 되돌려 이어서 처리한다. 여러 thread에서 공유 가능.
+    """
+
+    def __init__(self, path: str = JOBS_DB_PATH, max_attempts: int = MAX_ATTEMPTS):
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL UNIQUE, video_id TEXT,"
+                " state TEXT NOT NULL DEFAULT 'queued', attempts INTEGER NOT NULL DEFAULT 0,"
+                " name TEXT, output TEXT, source TEXT, error TEXT,"
+                " created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_video ON jobs (video_id)")
+
+    def add(self, url: str, video_id: str = None) -> int:
+        """
+        새 작업 등록 후 job id 반환. 이미 받아 둔 출력 파일이 남아 있는 영상이나 진행 중인 URL이면 None.
+        같은 URL이 failed였거나 done인데 출력 파일이 없어졌으면 시도 횟수를 초기화해 다시 queued로 만든다.
+        """
+        now = time.time()
+        with self._lock, self._db:
+            if video_id and any(owned_by(output, video_id) for (output,) in self._db.execute(
+                "SELECT output FROM jobs WHERE video_id = ? AND state = 'done' AND output IS NOT NULL", (video_id,)
+            )):
+                return None
+            row = self._db.execute("SELECT id, state, video_id, output FROM jobs WHERE url = ?", (url,)).fetchone()
+            if row is not None:
+                if row["state"] not in ("failed", "done"):
+                    return None
+                if row["state"] == "done" and row["output"] and owned_by(row["output"], row["video_id"]):
+                    return None
+                self._db.execute(
+                    "UPDATE jobs SET state = 'queued', attempts = 0, error = NULL, updated_at = ? WHERE id = ?",
+                    (now, row["id"]),
+                )
+                return row["id"]
+            cur = self._db.execute(
+                "INSERT OR IGNORE INTO jobs (url, video_id, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (url, video_id, now, now),
+            )
+            return cur.lastrowid if cur.rowcount else None
+
+    def resume(self) -> int:
+        """진행 중이던 작업과 재시도 여유가 있는 실패 작업을 queued로 되돌린다"""
+        with self._lock, self._db:
+            cur = self._db.execute(
+                f"UPDATE jobs SET state = 'queued', updated_at = ?"
+                f" WHERE state IN ({','.join('?' * len(ACTIVE_STATES))})"
+                f" OR (state = 'failed' AND attempts < ?)",
+                (time.time(), *ACTIVE_STATES, self.max_attempts),
+            )
+            return cur.rowcount
+
+    def queued(self) -> list:
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM jobs WHERE state = 'queued' ORDER BY id").fetchall()
+        return [dict(r) for r in rows]
+
+    def get(self, job_id: int) -> dict:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def find(self, url: str) -> dict:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row else None
+
+    def recent(self, limit: int = 100) -> list:
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def retry(self, job_id: int) -> bool:
+        """failed 작업을 시도 횟수를 초기화해 queued로 되돌린다. 되돌렸으면 True"""
+        with self._lock, self._db:
+            cur = self._db.execute(
+                "UPDATE jobs SET state = 'queued', attempts = 0, updated_at = ? WHERE id = ? AND state = 'failed'",
+                (time.time(), job_id),
+            )
+            return bool(cur.rowcount)
+
+    def start(self, job_id: int) -> None:
+        """resolving으로 전환하고 시도 횟수 증가"""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET state = 'resolving', attempts = attempts + 1, error = NULL, updated_at = ?"
+                " WHERE id = ?",
+                (time.time(), job_id),
+            )
+
+    def update(self, job_id: int, state: str, **fields) -> None:
+        if state not in JOB_STATES:
+            raise ValueError(f"unknown job state: {state}")
+        columns = {k: v for k, v in fields.items() if k in ("video_id", "name", "output", "source", "error")}
+        assignments = "".join(f", {k} = ?" for k in columns)
+        with self._lock, self._db:
+            self._db.execute(
+                f"UPDATE jobs SET state = ?, updated_at = ?{assignments} WHERE id = ?",
+                (state, time.time(), *columns.values(), job_id),
+            )
+
+    def fail(self, job_id: int, error: str) -> bool:
+        """실패 기록. 재시도 여유가 있으면 queued로 되돌리고 True 반환"""
+        with self._lock, self._db:
+            attempts = self._db.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+            retry = attempts < self.max_attempts
+            self._db.execute(
+                "UPDATE jobs SET state = ?, error = ?, updated_at = ? WHERE id = ?",
+                ("queued" if retry else "failed", error, time.time(), job_id),
+            )
+        return retry
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return {state: count for state, count in rows}
+
+
+def job_steps(store: JobStore, build_info, download, output_path) -> tuple:
+    """
+    job id를 받는 (build, run) 단계 함수. engine에 그대로 넘기면 단계마다 store에 상태가 기록된다.
+    output_path(info)가 이미 같은 video_id로 받아 둔 파일이면 다운로드 없이 done 처리한다
+    (제목만 같은 다른 영상의 파일은 건너뛰지 않는다).
+    """
+    def build(job_id):
+        job = store.get(job_id)
+        store.start(job_id)
+        try:
+            info = build_info(job["url"])
+        except Exception as e:
+            return {"job_id": job_id, "referer": job["url"], "error": f"resolve: {e}"}
+        info["job_id"] = job_id
+        info["on_state"] = lambda state: store.update(job_id, state)
+        store.update(job_id, "downloading", video_id=info["video_id"], name=info["name"])
+        return info
+
+    def record(job_id, output, result):
+        result["job_id"] = job_id
+        discard = result.pop("discard", None)
+        if result["success"]:
+            store.update(job_id, "done", output=output, source=result.get("source"))
+        else:
+            result["retry"] = store.fail(job_id, result.get("error") or "all routes failed")
+            # 더 시도하지 않는 작업은 이어받으려고 남겨 둔 중간 파일을 지운다
+            if not result["retry"] and discard is not None:
+                discard()
+        return result
+
+    def run(info):
+        job_id = info["job_id"]
+        if "error" in info:
+            retry = store.fail(job_id, info["error"])
+            return {"name": info["referer"], "success": False, "source": None, "retry": retry, "job_id": job_id}
+        output = output_path(info)
+        if owned_by(output, info["video_id"]):
+            NAMES.release(info["name"], info["video_id"])
+            store.update(job_id, "done", output=output, source="existing")
+            return {"name": info["referer"], "success": True, "source": "existing", "job_id": job_id}
+        try:
+            result = download(info)
+        except Exception as e:
+            result = {"name": info["referer"], "success": False, "source": None, "error": str(e)}
+        finalize = result.pop("finalize", None)
+        if finalize is None:
+            return record(job_id, output, result)
+        # mux/이동은 engine의 finalize 단계에서 실행되고, 그 결과로 상태를 기록한다
+        store.update(job_id, "muxing")
+        return dict(result, finalize=lambda: record(job_id, output, finalize()))
+
+    return build, run
+
+
+def process_queue(store: JobStore, engine, build_info, download, output_path) -> list:
+    """
+    queued 작업을 engine으로 처리하고 상태를 기록한다. 실패 작업은 max_attempts까지
+    다시 queued로 돌아가므로 큐가 빌 때까지 반복한다.
+    """
+    build, run = job_steps(store, build_info, download, output_path)
+    final = {}
+    while True:
+        job_ids = [job["id"] for job in store.queued()]
+        if not job_ids:
+            break
+        for result in engine.run_batch(job_ids, build, run):
+            final[result["job_id"]] = result
+    return list(final.values())
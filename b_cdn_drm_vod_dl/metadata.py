@@ -0,0 +1,113 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from .session import get_session
+
+PDING_API_URL = "https://backend.prod.pd-ing.com/api/cdn/video/{uuid}"
+TITLE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pding", "titles.json")
+TITLE_TTL = 30 * 24 * 3600
+TITLE_LRU_SIZE = 1024
+
+
+def clean_title(title: str) -> str:
+    """'사이트 | 제목' 또는 '접두어_제목' 형태에서 제목 부분만 남긴다"""
+    title = title.strip()
+    if '|' in title:
+        title = title.split('|', 1)[1].strip()
+    elif '_' in title:
+        parts = re.split(r'_\s*', title, 1)
+        title = parts[1].strip() if len(parts) > 1 else title
+    return title
+
+
+def fetch_api_title(uuid: str, referer: str, timeout: float = 10) -> str:
+    """pd-ing JSON API로 제목 조회. 제목이 없으면 None"""
+    headers = {
+        "User-Agent": "Mozilla/5.0",
+        "Referer": referer,
+        "Accept": "application/json",
+    }
+    resp = get_session().get(PDING_API_URL.format(uuid=uuid), headers=headers, timeout=timeout)
+    resp.raise_for_status()
+    title = resp.json().get("result", {}).get("title")
+    return clean_title(title) if title else None
+
+
+class TitleCache:
+    """
+    UUID → title. 메모리 LRU 앞단 + JSON 파일 뒷단, 항목별 TTL.
+    여러 thread에서 동시에 써도 안전하다.
+    """
+
+    def __init__(self, path: str = TITLE_CACHE_PATH, ttl: float = TITLE_TTL, max_memory: int = TITLE_LRU_SIZE):
+        self.path = path
+        self.ttl = ttl
+        self.max_memory = max_memory
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._disk = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        now = time.time()
+        return {k: v for k, v in entries.items() if now - v[1] <= self.ttl}
+
+    def get(self, uuid: str) -> str:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(uuid) or self._disk.get(uuid)
+            if entry is None or now - entry[1] > self.ttl:
+                return None
+            self._remember(uuid, entry)
+            return entry[0]
+
+    def put(self, uuid: str, title: str) -> None:
+        entry = (title, time.time())
+        with self._lock:
+            self._remember(uuid, entry)
+            self._disk[uuid] = entry
+            self._save_locked()
+
+    def _remember(self, uuid: str, entry: tuple) -> None:
+        self._memory[uuid] = entry
+        self._memory.move_to_end(uuid)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def _save_locked(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._disk, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_title_cache() -> TitleCache:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = TitleCache()
+        return _default
+
+
+def cached_title(uuid: str, fetch) -> str:
+    """캐시에 있으면 바로 반환, 없으면 fetch()로 조회 후 저장. fetch가 None을 주면 저장하지 않는다."""
+    cache = default_title_cache()
+    title = cache.get(uuid)
+    if title is None:
+        title = fetch()
+        if title:
+            cache.put(uuid, title)
+    return title
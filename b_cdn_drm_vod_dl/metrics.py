@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+COUNTERS = ("bytes", "requests", "retries")
+# 메모리에 남기는 최근 기록 수. 집계(summary)는 전체 기록 기준으로 따로 누적한다 (상주 모드용)
+MAX_RECORDS = 1000
+# (stage, prefix)별로 개수를 세는 서로 다른 오류 메시지 수
+MAX_ERRORS = 20
+
+
+class Metrics:
+    """
+    단계별(title, probe, hls, mp4, mux, move ...) 소요 시간, 바이트, 요청/재시도 수,
+    실패 사유를 prefix 등 tag와 함께 기록한다. path를 주면 기록마다 JSON line으로 남긴다.
+    records에는 최근 MAX_RECORDS개만 남고, summary는 그때그때 누적한 집계를 쓴다.
+
+        with METRICS.stage("mp4", prefix=prefix, variant=q) as rec:
+            rec["bytes"] = download_ranged(...)
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.records = deque(maxlen=MAX_RECORDS)
+        self._groups = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def configure(self, path: str) -> None:
+        with self._lock:
+            self.path = path
+
+    def current_stage(self) -> dict:
+        """이 thread에서 진행 중인 가장 안쪽 stage 기록 (없으면 None)"""
+        stack = getattr(self._local, "stack", None)
+        return stack[-1] if stack else None
+
+    def add(self, rec: dict, **counters) -> None:
+        """다른 thread(세그먼트 worker 등)에서 stage 기록에 카운터를 더한다"""
+        if rec is None:
+            return
+        with self._lock:
+            for key, value in counters.items():
+                rec[key] = rec.get(key, 0) + value
+
+    @contextmanager
+    def stage(self, stage: str, **tags):
+        rec = dict(tags, stage=stage, **{k: 0 for k in COUNTERS})
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(rec)
+        start = time.monotonic()
+        try:
+            yield rec
+        except BaseException as e:
+            rec.setdefault("error", f"{type(e).__name__}: {e}"[:300])
+            raise
+        finally:
+            stack.pop()
+            rec["duration"] = round(time.monotonic() - start, 3)
+            rec.setdefault("ok", "error" not in rec)
+            rec["ts"] = time.time()
+            self._emit(rec)
+
+    def _emit(self, rec: dict) -> None:
+        with self._lock:
+            self.records.append(rec)
+            self._accumulate(rec)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(rec, ensure_ascii=False, default=str) + "\n")
+
+    def _accumulate(self, rec: dict) -> None:
+        key = (rec["stage"], rec.get("prefix") or "-")
+        g = self._groups.setdefault(key, {"count": 0, "ok": 0, "duration": 0.0, "bytes": 0,
+                                          "requests": 0, "retries": 0, "errors": {}})
+        g["count"] += 1
+        g["ok"] += 1 if rec["ok"] else 0
+        g["duration"] += rec["duration"]
+        for k in COUNTERS:
+            g[k] += rec.get(k, 0)
+        error = rec.get("error")
+        if error and (error in g["errors"] or len(g["errors"]) < MAX_ERRORS):
+            g["errors"][error] = g["errors"].get(error, 0) + 1
+
+    def summary(self) -> list:
+        """(stage, prefix)별 집계"""
+        with self._lock:
+            groups = {key: dict(g, errors=dict(g["errors"])) for key, g in self._groups.items()}
+        rows = []
+        for (stage, prefix), g in sorted(groups.items()):
+            top_error = max(g["errors"].items(), key=lambda e: e[1])[0] if g["errors"] else ""
+            rows.append({
+                "stage": stage, "prefix": prefix, "count": g["count"], "ok": g["ok"],
+                "avg_s": round(g["duration"] / g["count"], 2), "total_s": round(g["duration"], 2),
+                "mb": round(g["bytes"] / 1e6, 1),
+                "mb_per_s": round(g["bytes"] / 1e6 / g["duration"], 2) if g["duration"] else 0.0,
+                "retries": g["retries"], "top_error": top_error,
+            })
+        return rows
+
+    def print_summary(self) -> None:
+        rows = self.summary()
+        if not rows:
+            return
+        columns = ("stage", "prefix", "count", "ok", "avg_s", "total_s", "mb", "mb_per_s", "retries", "top_error")
+        widths = {c: max(len(c), *(len(str(r[c])[:60]) for r in rows)) for c in columns}
+        print("\n=== Stage metrics ===")
+        print("  ".join(c.ljust(widths[c]) for c in columns))
+        for r in rows:
+            print("  ".join(str(r[c])[:60].ljust(widths[c]) for c in columns))
+
+
+METRICS = Metrics()
+
+
+def retries_of(resp) -> int:
+    """이 응답을 받기까지 재시도한 횟수 (urllib3 5xx 재시도 + rate limiter throttle 재시도)"""
+    retries = getattr(resp.raw, "retries", None)
+    return (len(retries.history) if retries is not None else 0) + getattr(resp, "throttle_retries", 0)
@@ -0,0 +1,66 @@
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from .hls import HLSDownloader, SEGMENT_CONCURRENCY
+
+# ffmpeg에 pipe fd를 그대로 넘기려면 pass_fds가 필요하다 (Windows 미지원)
+STREAM_MUX_SUPPORTED = os.name == "posix"
+
+
+def _feed(downloader: HLSDownloader, fd: int) -> None:
+    with os.fdopen(fd, "wb") as fp:
+        downloader.write_to(fp, downloader.load_playlist())
+
+
+def stream_mux(video_url: str, audio_url: str, headers: dict, output_path: str,
+               concurrency: int = SEGMENT_CONCURRENCY, extra_args: tuple = (), mirrors: list = None,
+               video_key: str = None) -> None:
+    """
+    video/audio playlist를 동시에 받으면서 pipe로 ffmpeg에 바로 넣어 -c copy 한다.
+    중간 파일 없이 output_path와 같은 디렉터리의 .part에 기록하고 성공 시 rename 한 번으로 끝낸다.
+    """
+    if not STREAM_MUX_SUPPORTED:
+        raise OSError("stream mux requires POSIX pipes")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    part = output_path + ".part"
+    video_r, video_w = os.pipe()
+    audio_r, audio_w = os.pipe()
+    cmd = [
+        "ffmpeg", "-loglevel", "error",
+        "-i", f"pipe:{video_r}", "-i", f"pipe:{audio_r}",
+        "-map", "0:v", "-map", "1:a", "-c", "copy", *extra_args,
+        "-f", "mp4", "-y", part,
+    ]
+    try:
+        proc = subprocess.Popen(cmd, pass_fds=(video_r, audio_r), stdin=subprocess.DEVNULL)
+    except BaseException:
+        for fd in (video_r, video_w, audio_r, audio_w):
+            os.close(fd)
+        raise
+    os.close(video_r)
+    os.close(audio_r)
+
+    error = None
+    # downloader는 호출 thread에서 만들어야 현재 metrics stage에 합산된다
+    video = HLSDownloader(video_url, headers, concurrency=concurrency, mirrors=mirrors, video_key=video_key)
+    audio = HLSDownloader(audio_url, headers, concurrency=concurrency, mirrors=mirrors, video_key=video_key)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(_feed, video, video_w), executor.submit(_feed, audio, audio_w)]
+        for f in futures:
+            try:
+                f.result()
+            except Exception as e:
+                # 한쪽이 실패하면 ffmpeg가 잘린 입력으로 "성공"하지 않도록 즉시 종료
+                error = error or e
+                proc.kill()
+    returncode = proc.wait()
+    try:
+        if error is not None:
+            raise error
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd)
+        os.replace(part, output_path)
+    finally:
+        if os.path.exists(part):
+            os.remove(part)
@@ -0,0 +1,71 @@
+import os
+import re
+import threading
+
+# Windows/Android 저장소에서 파일명으로 쓸 수 없는 문자
+INVALID_CHARS = r'[<>:"/\\|?*]'
+
+
+def sanitize_filename(name: str) -> str:
+    return re.sub(INVALID_CHARS, '_', name)
+
+
+def owner_path(path: str) -> str:
+    """출력 파일을 받은 영상 id를 적어 두는 숨김 파일 (.{파일명}.id)"""
+    head, tail = os.path.split(path)
+    return os.path.join(head, f".{tail}.id")
+
+
+def read_owner(path: str) -> str:
+    """path를 받은 영상 id (기록이 없으면 None)"""
+    try:
+        with open(owner_path(path), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def record_owner(path: str, owner: str) -> None:
+    with open(owner_path(path), "w", encoding="utf-8") as f:
+        f.write(owner)
+
+
+def owned_by(path: str, owner: str) -> bool:
+    """path가 있고 owner 영상으로 받은 파일인지 (같은 제목의 다른 영상이면 False)"""
+    return os.path.exists(path) and read_owner(path) == owner
+
+
+class NameRegistry:
+    """
+    같은 프로세스에서 돌고 있는 작업끼리 출력 파일 이름이 겹치지 않게 예약한다.
+    제목이 같은 다른 영상은 "{name} [{owner 앞 8자}]"를 받는다. 같은 owner는 항상 같은 이름.
+    directory를 주면 그 폴더에 이미 있는 "{이름}.mp4" 중 다른 영상(또는 기록이 없는 파일)의 것도 피한다.
+    예약은 작업이 끝나면 release()로 푼다.
+    """
+
+    def __init__(self):
+        self._owners = {}
+        self._lock = threading.Lock()
+
+    def claim(self, name: str, owner: str, directory: str = None) -> str:
+        with self._lock:
+            for candidate in (name, f"{name} [{owner[:8]}]", f"{name} [{owner}]"):
+                if self._owners.get(candidate, owner) != owner:
+                    continue
+                if directory:
+                    path = os.path.join(directory, f"{candidate}.mp4")
+                    if os.path.exists(path) and read_owner(path) != owner:
+                        continue
+                self._owners[candidate] = owner
+                return candidate
+        raise ValueError(f"file name already taken: {name} ({owner})")
+
+    def release(self, name: str, owner: str) -> None:
+        """작업이 끝나면 예약을 푼다 (상주 모드에서 목록이 계속 늘지 않게)"""
+        with self._lock:
+            if self._owners.get(name) == owner:
+                del self._owners[name]
+
+
+# 모든 Pipeline/스크립트가 공유하는 예약 목록
+NAMES = NameRegistry()
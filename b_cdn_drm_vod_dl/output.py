@@ -0,0 +1,140 @@
+import errno
+import os
+import shutil
+
+# 목적지와 다른 파일시스템일 때 목적지 안에 두는 작업 폴더 (갤러리/미디어 스캐너에서 숨김)
+STAGING_DIRNAME = ".pding-staging"
+COPY_CHUNK = 8 * 1024 * 1024
+# copy_file_range/sendfile을 지원하지 않는 조합에서 나는 오류 → 다음 방식으로 넘어간다
+_UNSUPPORTED = (errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.EBADF)
+
+
+def preallocate(path: str, size: int) -> None:
+    """size만큼 파일을 미리 잡아 둔다 (조각화 방지, 공간 부족을 먼저 발견)"""
+    mode = "r+b" if os.path.exists(path) else "wb"
+    with open(path, mode) as f:
+        f.truncate(size)
+        if hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(f.fileno(), 0, size)
+            except OSError:
+                pass
+
+
+def _existing(path: str) -> str:
+    """path 또는 존재하는 가장 가까운 상위 폴더"""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+def _device(path: str) -> int:
+    """path 또는 존재하는 가장 가까운 상위 폴더의 st_dev"""
+    return os.stat(_existing(path)).st_dev
+
+
+def free_space(path: str) -> int:
+    """path가 있는(아직 없으면 만들어질) 파일시스템의 남은 공간 (bytes)"""
+    return shutil.disk_usage(_existing(path)).free
+
+
+def same_device(a: str, b: str) -> bool:
+    """두 경로가 같은 파일시스템에 있어 rename만으로 옮길 수 있는지"""
+    try:
+        return _device(a) == _device(b)
+    except OSError:
+        return False
+
+
+def staging_dir(dest_dir: str, temp_dir: str) -> str:
+    """
+    다운로드 중간 파일을 둘 폴더. temp_dir이 dest_dir과 같은 파일시스템이면 temp_dir을,
+    아니면 dest_dir 안의 숨김 폴더를 써서 완료 후 이동이 항상 rename 한 번으로 끝나게 한다.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    os.makedirs(temp_dir, exist_ok=True)
+    if same_device(temp_dir, dest_dir):
+        return temp_dir
+    path = os.path.join(dest_dir, STAGING_DIRNAME)
+    os.makedirs(path, exist_ok=True)
+    nomedia = os.path.join(path, ".nomedia")
+    if not os.path.exists(nomedia):
+        open(nomedia, "wb").close()
+    return path
+
+
+def _copy_range(src, dst, size: int) -> bool:
+    """copy_file_range (커널 내 복사, 지원 시 reflink). 미지원이면 False"""
+    if not hasattr(os, "copy_file_range"):
+        return False
+    copied = 0
+    try:
+        while copied < size:
+            n = os.copy_file_range(src.fileno(), dst.fileno(), size - copied)
+            if n == 0:
+                break
+            copied += n
+    except OSError as e:
+        if copied or e.errno not in _UNSUPPORTED:
+            raise
+        return False
+    return copied == size
+
+
+def _sendfile(src, dst, size: int) -> bool:
+    if not hasattr(os, "sendfile"):
+        return False
+    copied = 0
+    try:
+        while copied < size:
+            n = os.sendfile(dst.fileno(), src.fileno(), copied, min(size - copied, 1 << 30))
+            if n == 0:
+                break
+            copied += n
+    except OSError as e:
+        if copied or e.errno not in _UNSUPPORTED:
+            raise
+        return False
+    return copied == size
+
+
+def copy_file(src: str, dst: str) -> int:
+    """
+    dst.part에 미리 공간을 잡고 copy_file_range → sendfile → 큰 버퍼 복사 순으로
+    가장 싼 방식으로 복사한 뒤 rename 한다. 복사한 바이트 수 반환.
+    """
+    size = os.path.getsize(src)
+    part = dst + ".part"
+    try:
+        preallocate(part, size)
+        with open(src, "rb") as fin, open(part, "r+b") as fout:
+            if not (_copy_range(fin, fout, size) or _sendfile(fin, fout, size)):
+                fin.seek(0)
+                fout.seek(0)
+                shutil.copyfileobj(fin, fout, COPY_CHUNK)
+            fout.truncate(size)
+        os.replace(part, dst)
+    except BaseException:
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+    return size
+
+
+def move_file(src: str, dst: str) -> int:
+    """같은 파일시스템이면 rename, 아니면 copy_file 후 원본 삭제. 파일 크기 반환."""
+    size = os.path.getsize(src)
+    if os.path.abspath(src) == os.path.abspath(dst):
+        return size
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        copy_file(src, dst)
+        os.remove(src)
+    return size
@@ -0,0 +1,190 @@
+import struct
+
+from .hls import HLSDownloader
+
+# -c copy로 mp4에 그대로 넣을 수 있는 codec (sample entry fourcc 기준)
+MP4_VIDEO_CODECS = ("avc1", "avc3", "hvc1", "hev1", "vp09", "av01")
+MP4_AUDIO_CODECS = ("mp4a", "ac-3", "ec-3", "Opus", "mp3", ".mp3", "fLaC")
+
+TS_PACKET = 188
+TS_SYNC = 0x47
+# PMT stream_type → codec
+TS_STREAM_TYPES = {
+    0x1b: ("video", "avc1"), 0x24: ("video", "hvc1"),
+    0x0f: ("audio", "mp4a"), 0x11: ("audio", "mp4a"),
+    0x03: ("audio", "mp3"), 0x04: ("audio", "mp3"),
+    0x81: ("audio", "ac-3"), 0x87: ("audio", "ec-3"),
+}
+TS_TIMESCALE = 90000
+_HANDLERS = {b"vide": "video", b"soun": "audio"}
+_CONTAINER_BOXES = (b"moov", b"trak", b"mdia", b"minf", b"stbl")
+
+
+class PreflightError(Exception):
+    """rendition 조합이 -c copy mux에 맞지 않음 (전체 다운로드 전에 발견)"""
+
+
+def _boxes(data: bytes, start: int, end: int):
+    """ISO BMFF box 순회: (type, payload 시작, box 끝)"""
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+def _sample_entry(data: bytes, start: int, end: int) -> str:
+    """stsd의 첫 sample entry fourcc. 암호화(encv/enca)면 frma의 원래 codec"""
+    for entry, entry_start, entry_end in _boxes(data, start + 8, end):
+        fourcc = entry.decode("latin-1")
+        if fourcc in ("encv", "enca"):
+            idx = data.find(b"frma", entry_start, entry_end)
+            if idx >= 0:
+                return data[idx + 4:idx + 8].decode("latin-1")
+        return fourcc
+    return None
+
+
+def _parse_trak(data: bytes, start: int, end: int) -> dict:
+    track = {"kind": None, "codec": None, "timescale": None}
+
+    def walk(s, e):
+        for box, ps, pe in _boxes(data, s, e):
+            if box in _CONTAINER_BOXES:
+                walk(ps, pe)
+            elif box == b"mdhd" and pe - ps >= 24:
+                offset = 20 if data[ps] == 1 else 12
+                track["timescale"] = struct.unpack_from(">I", data, ps + offset)[0]
+            elif box == b"hdlr" and pe - ps >= 12:
+                track["kind"] = _HANDLERS.get(data[ps + 8:ps + 12])
+            elif box == b"stsd":
+                track["codec"] = _sample_entry(data, ps, pe)
+
+    walk(start, end)
+    return track
+
+
+def parse_mp4(data: bytes) -> list:
+    """init section(ftyp+moov)의 track 목록. moov가 없으면(fragment만 있으면) 빈 목록"""
+    tracks = []
+    for box, ps, pe in _boxes(data, 0, len(data)):
+        if box == b"moov":
+            tracks += [_parse_trak(data, ts, te) for t, ts, te in _boxes(data, ps, pe) if t == b"trak"]
+    return tracks
+
+
+def _ts_payload(packet: bytes) -> tuple:
+    """(PID, payload_unit_start, payload)"""
+    pid = ((packet[1] & 0x1f) << 8) | packet[2]
+    pusi = bool(packet[1] & 0x40)
+    control = (packet[3] >> 4) & 0x3
+    pos = 4
+    if control in (2, 3):
+        pos += 1 + packet[4]
+    return pid, pusi, packet[pos:] if control in (1, 3) else b""
+
+
+def _section(payload: bytes) -> bytes:
+    """pointer_field를 건너뛴 PSI section (CRC 제외)"""
+    pos = 1 + payload[0]
+    if pos + 3 > len(payload):
+        return b""
+    length = ((payload[pos + 1] & 0x0f) << 8) | payload[pos + 2]
+    return payload[pos:pos + 3 + length - 4]
+
+
+def parse_ts(data: bytes) -> list:
+    """PAT → PMT를 읽어 elementary stream 목록을 만든다"""
+    pmt_pids = set()
+    tracks = []
+    for pos in range(0, len(data) - TS_PACKET + 1, TS_PACKET):
+        packet = data[pos:pos + TS_PACKET]
+        if packet[0] != TS_SYNC:
+            break
+        pid, pusi, payload = _ts_payload(packet)
+        if not pusi or not payload:
+            continue
+        if pid == 0:
+            section = _section(payload)
+            for i in range(8, len(section) - 3, 4):
+                program = struct.unpack_from(">H", section, i)[0]
+                if program:
+                    pmt_pids.add(struct.unpack_from(">H", section, i + 2)[0] & 0x1fff)
+        elif pid in pmt_pids:
+            section = _section(payload)
+            if len(section) < 12:
+                continue
+            pos_es = 12 + (struct.unpack_from(">H", section, 10)[0] & 0x0fff)
+            while pos_es + 5 <= len(section):
+                stream_type = section[pos_es]
+                es_info = struct.unpack_from(">H", section, pos_es + 3)[0] & 0x0fff
+                kind, codec = TS_STREAM_TYPES.get(stream_type, (None, f"ts:0x{stream_type:02x}"))
+                tracks.append({"kind": kind, "codec": codec, "timescale": TS_TIMESCALE})
+                pos_es += 5 + es_info
+            return tracks
+    return tracks
+
+
+def sniff(data: bytes) -> dict:
+    """init section 또는 첫 세그먼트 바이트로 container와 track(kind, codec, timescale)을 알아낸다"""
+    if len(data) >= TS_PACKET and data[0] == TS_SYNC and (len(data) < 2 * TS_PACKET or data[TS_PACKET] == TS_SYNC):
+        return {"container": "ts", "tracks": parse_ts(data)}
+    if data[4:8] in (b"ftyp", b"moov", b"styp", b"moof", b"sidx"):
+        return {"container": "fmp4", "tracks": parse_mp4(data)}
+    if data[:3] == b"ID3" or (len(data) > 1 and data[0] == 0xff and data[1] & 0xf6 == 0xf0):
+        return {"container": "adts", "tracks": [{"kind": "audio", "codec": "mp4a", "timescale": None}]}
+    if data.lstrip()[:1] in (b"<", b"{"):
+        return {"container": "text", "tracks": []}
+    return {"container": None, "tracks": []}
+
+
+def probe_rendition(m3u8_url: str, headers: dict, video_key: str = None) -> dict:
+    """
+    media playlist의 init section(없으면 첫 세그먼트)만 받아 sniff 한다.
+    받은 바이트는 segment cache에 남으므로 이어지는 전체 다운로드에서 다시 받지 않는다.
+    """
+    downloader = HLSDownloader(m3u8_url, headers, video_key=video_key)
+    return sniff(downloader.first_chunk(downloader.load_playlist()))
+
+
+def _track(info: dict, kind: str) -> dict:
+    return next((t for t in info["tracks"] if t["kind"] == kind), None)
+
+
+def check_pair(video: dict, audio: dict) -> str:
+    """-c copy mux가 확실히 실패할 조합이면 이유, 아니면(모르는 경우 포함) None"""
+    for label, info, kind, codecs in (("video", video, "video", MP4_VIDEO_CODECS),
+                                      ("audio", audio, "audio", MP4_AUDIO_CODECS)):
+        if info["container"] == "text":
+            return f"{label} rendition returned a text/HTML body instead of media"
+        if not info["tracks"]:
+            continue
+        track = _track(info, kind)
+        if track is None:
+            found = ", ".join(str(t["codec"]) for t in info["tracks"])
+            return f"{label} rendition has no {kind} track ({found})"
+        if track["codec"] and track["codec"] not in codecs:
+            return f"{label} codec {track['codec']} cannot be stream-copied into mp4"
+        if track["timescale"] == 0:
+            return f"{label} track has an invalid timescale (0)"
+    return None
+
+
+def preflight_pair(video_m3u8: str, audio_m3u8: str, headers: dict, video_key: str = None) -> dict:
+    """video/audio rendition을 미리 확인. 맞지 않으면 PreflightError, 맞으면 sniff 결과"""
+    video = probe_rendition(video_m3u8, headers, video_key)
+    audio = probe_rendition(audio_m3u8, headers, video_key)
+    reason = check_pair(video, audio)
+    if reason:
+        raise PreflightError(reason)
+    return {"video": video, "audio": audio}
@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import METRICS
+from .output import preallocate
+from .ratelimit import LIMITER
+from .session import get_session
+
+RANGE_CONNECTIONS = 4
+# 이보다 작은 구간으로는 나누지 않는다
+MIN_PART_SIZE = 8 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+# 구간당 연결 끊김 재시도 횟수 (끊긴 위치부터 이어받음)
+PART_RETRIES = 3
+# 진행 상황 sidecar 저장 주기 (바이트)
+PROGRESS_INTERVAL = 16 * 1024 * 1024
+TIMEOUT = 10
+
+
+def _content_length(url: str, headers: dict, timeout: float) -> tuple:
+    """(전체 크기 또는 None, range 요청 지원 여부)"""
+    with get_session().get(url, headers=dict(headers, Range="bytes=0-0"), stream=True, timeout=timeout) as resp:
+        resp.raise_for_status()
+        if resp.status_code == 206:
+            total = resp.headers.get("Content-Range", "").rpartition("/")[2]
+            if total.isdigit():
+                return int(total), True
+        length = resp.headers.get("Content-Length")
+        return (int(length) if length and resp.status_code == 200 else None), False
+
+
+def _split(size: int, connections: int) -> list:
+    count = max(1, min(connections, size // MIN_PART_SIZE or 1))
+    step = -(-size // count)
+    return [[start, min(start + step, size) - 1, start] for start in range(0, size, step)]
+
+
+class _Progress:
+    """sidecar 파일: {"url", "size", "parts": [[start, end, next_offset], ...]}"""
+
+    def __init__(self, path: str, url: str, size: int, parts: list):
+        self.path = path
+        self.url = url
+        self.size = size
+        self.parts = parts
+        self._lock = threading.Lock()
+        self._unsaved = 0
+
+    @classmethod
+    def load(cls, path: str, url: str, size: int):
+        try:
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("url") != url or state.get("size") != size:
+            return None
+        return cls(path, url, size, state["parts"])
+
+    def advance(self, index: int, nbytes: int) -> None:
+        with self._lock:
+            self.parts[index][2] += nbytes
+            self._unsaved += nbytes
+            if self._unsaved >= PROGRESS_INTERVAL:
+                self._save_locked()
+
+    def save(self) -> None:
+        with self._lock:
+            self._save_locked()
+
+    def _save_locked(self) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"url": self.url, "size": self.size, "parts": self.parts}, f)
+        os.replace(tmp, self.path)
+        self._unsaved = 0
+
+
+def _fetch_part(url: str, headers: dict, part_path: str, progress: _Progress, index: int, timeout: float,
+                stage: dict = None) -> None:
+    """
+    part 하나를 끝까지 받는다. 연결이 중간에 끊기면 받은 위치부터 다시 요청하고,
+    한 바이트도 늘지 않은 시도가 PART_RETRIES번 넘게 이어지면 포기한다 (끝까지 못 받으면 예외)
+    """
+    failures = 0
+    first = True
+    while True:
+        start, end, pos = progress.parts[index]
+        if pos > end:
+            return
+        if failures > PART_RETRIES:
+            raise IOError(f"part {index} incomplete: {pos - start}/{end - start + 1} bytes")
+        METRICS.add(stage, requests=1, retries=0 if first else 1)
+        first = False
+        error = None
+        try:
+            with get_session().get(url, headers=dict(headers, Range=f"bytes={pos}-{end}"),
+                                   stream=True, timeout=timeout) as resp:
+                resp.raise_for_status()
+                if resp.status_code != 206:
+                    raise IOError(f"range request ignored (HTTP {resp.status_code})")
+                with open(part_path, "r+b") as f:
+                    f.seek(pos)
+                    for chunk in resp.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+                        progress.advance(index, len(chunk))
+                        LIMITER.consume_bytes(len(chunk))
+        except Exception as e:
+            error = e
+        # 진행이 있었던 시도는 재시도 횟수에 넣지 않는다
+        if progress.parts[index][2] > pos:
+            failures = 0
+            continue
+        failures += 1
+        if failures > PART_RETRIES and error is not None:
+            raise error
+
+
+def _download_single(url: str, dest: str, headers: dict, timeout: float) -> int:
+    part_path = dest + ".part"
+    written = 0
+    with get_session().get(url, headers=headers, stream=True, timeout=timeout) as resp:
+        resp.raise_for_status()
+        with open(part_path, "wb") as f:
+            for chunk in resp.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+                written += len(chunk)
+                LIMITER.consume_bytes(len(chunk))
+    os.replace(part_path, dest)
+    return written
+
+
+def download_ranged(url: str, dest: str, headers: dict, connections: int = RANGE_CONNECTIONS,
+                    timeout: float = TIMEOUT) -> int:
+    """
+    Content-Length 기준으로 파일을 여러 byte range로 나눠 병렬 다운로드한다.
+    dest.part에 각 구간을 offset 위치에 기록하고, dest.part.progress sidecar로
+    중단된 다운로드를 이어받는다. 완료 시 dest로 rename.
+    서버가 range를 지원하지 않으면 단일 스트림으로 받는다.
+    """
+    size, ranged = _content_length(url, headers, timeout)
+    if not ranged or not size:
+        return _download_single(url, dest, headers, timeout)
+
+    part_path = dest + ".part"
+    progress_path = part_path + ".progress"
+    progress = _Progress.load(progress_path, url, size) if os.path.exists(part_path) else None
+    if progress is None:
+        progress = _Progress(progress_path, url, size, _split(size, connections))
+    preallocate(part_path, size)
+    progress.save()
+
+    pending = [i for i, (_, end, pos) in enumerate(progress.parts) if pos <= end]
+    stage = METRICS.current_stage()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(pending))) as executor:
+            futures = [
+                executor.submit(_fetch_part, url, headers, part_path, progress, i, timeout, stage)
+                for i in pending
+            ]
+            for f in futures:
+                f.result()
+    finally:
+        progress.save()
+
+    os.replace(part_path, dest)
+    os.remove(progress_path)
+    return size
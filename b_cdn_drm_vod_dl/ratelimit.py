@@ -0,0 +1,177 @@
+import re
+import threading
+import time
+
+# host당 기본 초당 요청 수 상한 (throttle 당하면 줄었다가 성공이 이어지면 다시 회복)
+REQUESTS_PER_HOST = 100
+MIN_REQUESTS_PER_HOST = 1
+# 전체 다운로드 속도 상한 (bytes/s, None이면 무제한)
+BYTES_PER_SECOND = None
+# host당 동시 요청 수 상한의 초기값/최대값 (session pool 크기와 맞춘다)
+MAX_ACTIVE_PER_HOST = 16
+# CDN이 "너무 많다"고 알려주는 상태 코드. variant 없음(404)과 달리 재시도 대상이다
+THROTTLE_STATUSES = (429, 503)
+THROTTLE_BACKOFF = 0.5
+THROTTLE_BACKOFF_MAX = 30.0
+
+
+def parse_rate(value: str) -> int:
+    """'500K', '8M', '1.5G', '1000000' → bytes/s"""
+    m = re.fullmatch(r"\s*([\d.]+)\s*([KMG]?)i?B?\s*", value, re.IGNORECASE)
+    if not m:
+        raise ValueError(f"invalid rate: {value}")
+    scale = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}[m.group(2).upper()]
+    return int(float(m.group(1)) * scale)
+
+
+class Throttled(Exception):
+    """재시도 후에도 throttle 응답이라 variant가 있는지 없는지 알 수 없음"""
+
+
+def is_throttled(exc: BaseException) -> bool:
+    """재시도 후에도 429/503으로 끝난 HTTPError(또는 Throttled)인지 (variant가 없는 것과 구분)"""
+    if isinstance(exc, Throttled):
+        return True
+    resp = getattr(exc, "response", None)
+    return resp is not None and resp.status_code in THROTTLE_STATUSES
+
+
+class TokenBucket:
+    """
+    rate(단위/초)로 채워지는 token bucket. acquire(n)은 부족한 만큼 미리 빌려 쓰고
+    그 시간만큼 잠들기 때문에 n이 burst보다 커도 평균 속도가 rate를 넘지 않는다.
+    rate가 None이면 제한 없음.
+    """
+
+    def __init__(self, rate: float = None, burst: float = None):
+        self._lock = threading.Lock()
+        self.rate = rate
+        self.burst = burst or rate or 0
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+
+    def set_rate(self, rate: float, burst: float = None) -> None:
+        with self._lock:
+            self.rate = rate
+            self.burst = burst or rate or 0
+            self.tokens = min(self.tokens, self.burst)
+
+    def acquire(self, n: float = 1) -> None:
+        with self._lock:
+            if not self.rate:
+                return
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.tokens -= n
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class _Host:
+    def __init__(self, rate: float, max_active: int):
+        self.cond = threading.Condition()
+        self.bucket = TokenBucket(rate)
+        self.rate = rate
+        self.limit = max_active
+        self.active = 0
+        self.successes = 0
+        self.strikes = 0
+        self.blocked_until = 0.0
+
+
+class RateLimiter:
+    """
+    host별 동시 요청 수(AIMD)와 초당 요청 수(token bucket), 전체 bytes/s를 함께 제한한다.
+    429/503을 받으면 해당 host의 동시 요청 수와 요청 속도를 절반으로 줄이고 Retry-After
+    (없으면 지수 backoff) 동안 새 요청을 막는다. 성공이 이어지면 조금씩 원래 상한까지 회복한다.
+    session adapter가 모든 요청(MP4, HLS, 제목 API, candfans)에 대해 호출한다.
+    """
+
+    def __init__(self, requests_per_host: float = REQUESTS_PER_HOST, bytes_per_second: float = BYTES_PER_SECOND,
+                 max_active: int = MAX_ACTIVE_PER_HOST):
+        self.requests_per_host = requests_per_host
+        self.max_active = max_active
+        self.bytes = TokenBucket(bytes_per_second)
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def configure(self, requests_per_host: float = None, bytes_per_second: float = None,
+                  max_active: int = None) -> None:
+        """None인 항목은 그대로 둔다. 이미 본 host도 새 상한에서 다시 시작한다"""
+        with self._lock:
+            if requests_per_host is not None:
+                self.requests_per_host = requests_per_host
+            if max_active is not None:
+                self.max_active = max(1, max_active)
+            states = list(self._hosts.values())
+        for state in states:
+            with state.cond:
+                state.limit = self.max_active
+                state.rate = self.requests_per_host
+                state.bucket.set_rate(state.rate)
+                state.cond.notify_all()
+        if bytes_per_second is not None:
+            self.bytes.set_rate(bytes_per_second or None)
+
+    def _host(self, host: str) -> _Host:
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = _Host(self.requests_per_host, self.max_active)
+            return state
+
+    def before_request(self, host: str) -> None:
+        """cooldown이 끝나고 동시 요청 슬롯과 요청 token을 얻을 때까지 대기"""
+        state = self._host(host)
+        with state.cond:
+            while True:
+                wait = state.blocked_until - time.monotonic()
+                if wait > 0:
+                    state.cond.wait(wait)
+                elif state.active >= state.limit:
+                    state.cond.wait()
+                else:
+                    break
+            state.active += 1
+        state.bucket.acquire()
+
+    def after_response(self, host: str, status: int = None, retry_after: str = None) -> None:
+        """before_request 짝. status가 None이면(연결 오류 등) 슬롯만 반납한다"""
+        state = self._host(host)
+        with state.cond:
+            state.active -= 1
+            if status in THROTTLE_STATUSES:
+                self._throttled(state, retry_after)
+            elif status is not None:
+                self._succeeded(state)
+            state.cond.notify_all()
+
+    def _throttled(self, state: _Host, retry_after: str) -> None:
+        state.limit = max(1, state.limit // 2)
+        state.rate = max(MIN_REQUESTS_PER_HOST, state.rate / 2)
+        state.bucket.set_rate(state.rate)
+        state.successes = 0
+        delay = float(retry_after) if retry_after and retry_after.strip().isdigit() else \
+            THROTTLE_BACKOFF * 2 ** state.strikes
+        state.strikes += 1
+        state.blocked_until = max(state.blocked_until, time.monotonic() + min(delay, THROTTLE_BACKOFF_MAX))
+
+    def _succeeded(self, state: _Host) -> None:
+        state.strikes = 0
+        state.successes += 1
+        # 현재 상한만큼 연속 성공하면 동시 요청 +1, 속도 +10%
+        if state.successes >= state.limit:
+            state.successes = 0
+            state.limit = min(self.max_active, state.limit + 1)
+            if state.rate < self.requests_per_host:
+                state.rate = min(self.requests_per_host, state.rate * 1.1)
+                state.bucket.set_rate(state.rate)
+
+    def consume_bytes(self, n: int) -> None:
+        """받은 바이트만큼 전체 bandwidth token을 소비 (부족하면 대기)"""
+        self.bytes.acquire(n)
+
+
+LIMITER = RateLimiter()
@@ -0,0 +1,80 @@
+import re
+
+import m3u8
+
+from .session import get_session
+
+TIMEOUT = 10
+
+
+def _quality_number(text: str) -> int:
+    """'audio/256a/audio.m3u8' → 256, 숫자가 없으면 0"""
+    m = re.search(r"(\d+)a\b", text or "")
+    return int(m.group(1)) if m else 0
+
+
+def load_master(url: str, headers: dict, timeout: float = TIMEOUT) -> m3u8.M3U8:
+    """master playlist를 한 번 받아 파싱. 없거나 master가 아니면 None"""
+    try:
+        resp = get_session().get(url, headers=headers, timeout=timeout)
+        if resp.status_code != 200:
+            return None
+        playlist = m3u8.loads(resp.text, uri=url)
+    except Exception:
+        return None
+    return playlist if playlist.is_variant else None
+
+
+def list_renditions(master: m3u8.M3U8) -> list:
+    """
+    master에 실제로 있는 video rendition 목록.
+    각 항목: url, bandwidth, width, height, codecs, audio_url(별도 audio가 있으면), audio_name
+    """
+    renditions = []
+    for variant in master.playlists:
+        info = variant.stream_info
+        width, height = info.resolution or (0, 0)
+        audio = [m for m in variant.media if m.type == "AUDIO" and m.uri]
+        best_audio = max(audio, key=lambda m: (m.default == "YES", _quality_number(m.uri)), default=None)
+        renditions.append({
+            "url": variant.absolute_uri,
+            "bandwidth": info.bandwidth or 0,
+            "width": width,
+            "height": height,
+            "codecs": info.codecs or "",
+            "audio_url": best_audio.absolute_uri if best_audio else None,
+            "audio_name": (best_audio.name or f"{_quality_number(best_audio.uri)}a") if best_audio else None,
+        })
+    return renditions
+
+
+def select_rendition(renditions: list, max_height: int = None, preferred_codec: str = None,
+                     max_bandwidth: int = None) -> dict:
+    """
+    정책에 맞는 가장 좋은 rendition 선택.
+    max_height / max_bandwidth를 넘는 것은 제외하고, preferred_codec('avc1', 'hvc1', 'vp09', 'av01' 등
+    CODECS 접두어)이 맞는 것을 우선한 뒤 해상도, bandwidth 순으로 고른다.
+    """
+    allowed = [
+        r for r in renditions
+        if (max_height is None or r["height"] <= max_height)
+        and (max_bandwidth is None or r["bandwidth"] <= max_bandwidth)
+    ]
+    if not allowed:
+        return None
+
+    def rank(r):
+        codec_match = bool(preferred_codec) and any(
+            c.strip().startswith(preferred_codec) for c in r["codecs"].split(",")
+        )
+        return codec_match, r["height"], r["bandwidth"]
+
+    return max(allowed, key=rank)
+
+
+def pick_from_master(url: str, headers: dict, **policy) -> dict:
+    """master playlist 한 번으로 정책에 맞는 rendition 선택. master가 없으면 None"""
+    master = load_master(url, headers)
+    if master is None:
+        return None
+    return select_rendition(list_renditions(master), **policy)
@@ -0,0 +1,91 @@
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+
+from .cdn import cdn_url
+from .ratelimit import THROTTLE_STATUSES, Throttled
+from .session import get_session
+
+PROBE_TIMEOUT = 5
+PROBE_WORKERS = 16
+# 선택된 후보와 같은 kind/variant를 제공하는 다른 prefix(mirror)의 probe를 더 기다리는 시간 (초)
+MIRROR_WAIT = 0.5
+# probe 결과: 있음 / 없음 / throttle 때문에 알 수 없음 (없음으로 보고 낮은 variant로 내려가면 안 된다)
+FOUND = "found"
+MISSING = "missing"
+THROTTLED = "throttled"
+
+
+def probe_url(url: str, headers: dict, timeout: float = PROBE_TIMEOUT) -> str:
+    """1바이트 range GET으로 리소스 존재 여부만 확인: FOUND, MISSING, THROTTLED"""
+    probe_headers = dict(headers, Range="bytes=0-0")
+    try:
+        with get_session().get(url, headers=probe_headers, stream=True, timeout=timeout) as resp:
+            if resp.status_code in (200, 206):
+                return FOUND
+            return THROTTLED if resp.status_code in THROTTLE_STATUSES else MISSING
+    except requests.RequestException:
+        return MISSING
+
+
+def build_candidates(vid: str, prefixes: list, mp4_qualities: list, video_resolutions: list) -> list:
+    """
+    prefix 순서대로 playlist.m3u8 → video/{res}/video.m3u8 → play_*.mp4 후보 목록 생성.
+    목록 순서가 곧 우선순위.
+    """
+    candidates = []
+    for prefix in prefixes:
+        candidates.append({
+            "prefix": prefix, "kind": "hls", "variant": "playlist.m3u8",
+            "url": cdn_url(prefix, f"{vid}/playlist.m3u8"),
+        })
+        for res in video_resolutions:
+            candidates.append({
+                "prefix": prefix, "kind": "advanced", "variant": res,
+                "url": cdn_url(prefix, f"{vid}/video/{res}/video.m3u8"),
+            })
+        for q in mp4_qualities:
+            candidates.append({
+                "prefix": prefix, "kind": "mp4", "variant": q,
+                "url": cdn_url(prefix, f"{vid}/{q}"),
+            })
+    return candidates
+
+
+def race(candidates: list, headers: dict, max_workers: int = PROBE_WORKERS) -> dict:
+    """
+    모든 후보를 동시에 probe 한다. 성공한 후보 중 자신보다 앞선 후보가 모두 실패로
+    확정된 첫 후보를 반환하므로, 전체 대기 시간은 가장 느린 probe 한 번으로 제한된다.
+    앞선 후보가 throttle로 끝나면 뒤(낮은 우선순위) 후보로 내려가지 않고 Throttled를 낸다.
+    """
+    if not candidates:
+        return None
+    status = [None] * len(candidates)
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(candidates)))
+    futures = {executor.submit(probe_url, c["url"], headers): i for i, c in enumerate(candidates)}
+    try:
+        for f in as_completed(futures):
+            status[futures[f]] = f.result()
+            for i, state in enumerate(status):
+                if state is None:
+                    break
+                if state == THROTTLED:
+                    raise Throttled(f"throttled while probing {candidates[i]['url']}")
+                if state == FOUND:
+                    return dict(candidates[i], mirrors=_mirrors(candidates, futures, candidates[i]))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return None
+
+
+def _mirrors(candidates: list, futures: dict, winner: dict) -> list:
+    """winner와 같은 kind/variant가 확인된 다른 prefix. 아직 진행 중인 probe는 MIRROR_WAIT까지만 기다린다"""
+    same = [f for f, i in futures.items()
+            if candidates[i]["prefix"] != winner["prefix"]
+            and (candidates[i]["kind"], candidates[i]["variant"]) == (winner["kind"], winner["variant"])]
+    wait(same, timeout=MIRROR_WAIT)
+    return [candidates[futures[f]]["prefix"] for f in same
+            if f.done() and not f.cancelled() and f.result() == FOUND]
+
+
+def resolve_route(vid: str, headers: dict, prefixes: list, mp4_qualities: list, video_resolutions: list) -> dict:
+    return race(build_candidates(vid, prefixes, mp4_qualities, video_resolutions), headers)
@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import threading
+import time
+
+ROUTE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pding", "routes.sqlite3")
+ROUTE_TTL = 7 * 24 * 3600
+ROUTE_CACHE_MAX = 5000
+
+# route dict 필드. layout: "hls" | "mp4" | "advanced"
+ROUTE_FIELDS = ("prefix", "layout", "codec", "resolution", "audio")
+
+
+class RouteCache:
+    """
+    video UUID → 마지막으로 성공한 다운로드 경로(prefix, layout, codec, resolution, audio).
+    TTL이 지난 항목은 무시하고, ROUTE_CACHE_MAX를 넘으면 가장 오래 안 쓴 항목부터 삭제한다.
+    여러 worker thread에서 같이 써도 되도록 connection 하나를 lock으로 보호한다.
+    """
+
+    def __init__(self, path: str = ROUTE_CACHE_PATH, ttl: float = ROUTE_TTL, max_entries: int = ROUTE_CACHE_MAX):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS routes ("
+                " video_id TEXT PRIMARY KEY, prefix TEXT NOT NULL, layout TEXT NOT NULL,"
+                " codec TEXT, resolution TEXT, audio TEXT,"
+                " updated_at REAL NOT NULL, used_at REAL NOT NULL)"
+            )
+
+    def get(self, video_id: str) -> dict:
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT prefix, layout, codec, resolution, audio, updated_at FROM routes WHERE video_id = ?",
+                (video_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[5] > self.ttl:
+                self._db.execute("DELETE FROM routes WHERE video_id = ?", (video_id,))
+                return None
+            self._db.execute("UPDATE routes SET used_at = ? WHERE video_id = ?", (now, video_id))
+        return dict(zip(ROUTE_FIELDS, row[:5]))
+
+    def put(self, video_id: str, route: dict) -> None:
+        now = time.time()
+        values = [route.get(k) for k in ROUTE_FIELDS]
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO routes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (video_id, *values, now, now),
+            )
+            self._db.execute(
+                "DELETE FROM routes WHERE video_id IN ("
+                " SELECT video_id FROM routes ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def invalidate(self, video_id: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM routes WHERE video_id = ?", (video_id,))
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> RouteCache:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = RouteCache()
+        return _default
@@ -0,0 +1,116 @@
+import asyncio
+import itertools
+import time
+
+from .output import free_space, same_device
+
+# fifo: 들어온 순서, sjf: 예상 크기가 작은 것부터, fair: sjf + 오래 기다린 작업일수록 앞으로
+POLICIES = ("fifo", "sjf", "fair")
+DEFAULT_POLICY = "fifo"
+# fair: 이만큼 기다릴 때마다 예상 크기를 절반으로 보고 순서를 매긴다 (초)
+FAIR_HALF_LIFE = 60
+# 다운로드를 시작해도 이만큼은 비워 둔다 (bytes)
+DISK_HEADROOM = 256 * 1024 * 1024
+
+
+def disk_shortfall(footprint: dict, reserved: dict = None, headroom: int = DISK_HEADROOM) -> str:
+    """
+    footprint({폴더: 예상 사용량})를 쓰고도 headroom이 남는지 확인한다.
+    reserved는 이미 시작한 작업들이 잡아 둔 {폴더: bytes}. 부족하면 이유, 충분하면 None.
+    """
+    for path, need in (footprint or {}).items():
+        taken = sum(n for p, n in (reserved or {}).items() if same_device(p, path))
+        try:
+            available = free_space(path) - taken - headroom
+        except OSError:
+            continue
+        if need > available:
+            return (f"not enough disk space in {path}: need {need // 2**20} MiB, "
+                    f"{max(0, available) // 2**20} MiB available")
+    return None
+
+
+class JobScheduler:
+    """
+    DownloadEngine의 다운로드 slot. asyncio.Semaphore처럼 동시에 max_jobs개만 통과시키되,
+    기다리는 작업 중 policy 순서로 다음 작업을 고르고 info["footprint"]만큼 디스크가 남는 작업만
+    시작시킨다. 잡아 둔 공간은 release_disk()(mux/이동까지 끝난 뒤)에 돌려준다.
+    예상 크기(info["size"])를 모르는 작업은 sjf/fair에서 크기를 아는 작업 뒤로 간다.
+    기다려도 공간이 생기지 않는 작업은 info["disk_shortfall"]에 이유를 적어 그대로 보낸다.
+    진행 중인 작업이 이미 쓴 만큼은 남은 공간과 예약에 둘 다 잡히므로 판단은 보수적이다.
+    """
+
+    def __init__(self, slots: int, policy: str = DEFAULT_POLICY, headroom: int = DISK_HEADROOM):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown scheduling policy: {policy}")
+        self.free = slots
+        self.policy = policy
+        self.headroom = headroom
+        self._reserved = {}
+        self._running = 0
+        self._waiting = []
+        self._seq = itertools.count()
+
+    def _rank(self, entry: dict, now: float) -> tuple:
+        size = entry["size"]
+        if self.policy == "fifo":
+            return (entry["seq"],)
+        if size is None:
+            return (1, 0, entry["seq"])
+        if self.policy == "fair":
+            size = size / 2 ** ((now - entry["queued_at"]) / FAIR_HALF_LIFE)
+        return (0, size, entry["seq"])
+
+    async def acquire(self, info) -> None:
+        info = info if isinstance(info, dict) else {}
+        entry = {
+            "seq": next(self._seq), "size": info.get("size"), "footprint": info.get("footprint") or {},
+            "queued_at": time.monotonic(), "future": asyncio.get_running_loop().create_future(), "info": info,
+        }
+        self._waiting.append(entry)
+        self._dispatch()
+        try:
+            await entry["future"]
+        except asyncio.CancelledError:
+            if entry in self._waiting:
+                self._waiting.remove(entry)
+            elif not entry["future"].cancelled():
+                self.release()
+                self.release_disk(info)
+            raise
+
+    def release(self) -> None:
+        """다운로드 slot 반환"""
+        self.free += 1
+        self._dispatch()
+
+    def release_disk(self, info) -> None:
+        """작업이 끝나 중간 파일이 정리된 뒤 잡아 둔 디스크 공간 반환"""
+        footprint = info.get("footprint") if isinstance(info, dict) else None
+        for path, need in (footprint or {}).items():
+            self._reserved[path] = self._reserved.get(path, 0) - need
+            if self._reserved[path] <= 0:
+                del self._reserved[path]
+        self._running -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        self._waiting = [e for e in self._waiting if not e["future"].cancelled()]
+        while self.free > 0 and self._waiting:
+            ordered = sorted(self._waiting, key=lambda e: self._rank(e, now))
+            entry = next((e for e in ordered
+                          if not disk_shortfall(e["footprint"], self._reserved, self.headroom)), None)
+            if entry is None:
+                # 진행 중인 작업이 있으면 공간이 돌아올 때까지 기다린다. 없으면 기다려도 늘지 않으므로
+                # 맨 앞 작업을 이유와 함께 보내 download 단계에서 받기 전에 실패 처리되게 한다
+                if self._running:
+                    return
+                entry = ordered[0]
+                entry["info"]["disk_shortfall"] = disk_shortfall(entry["footprint"], self._reserved, self.headroom)
+            self._waiting.remove(entry)
+            for path, need in entry["footprint"].items():
+                self._reserved[path] = self._reserved.get(path, 0) + need
+            self.free -= 1
+            self._running += 1
+            entry["future"].set_result(None)
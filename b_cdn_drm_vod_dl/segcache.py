@@ -0,0 +1,129 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+SEGMENT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pding", "segments")
+SEGMENT_CACHE_MAX = 1024 * 1024 * 1024
+# 상한을 넘으면 이 비율까지 줄인다 (세그먼트마다 eviction이 돌지 않도록)
+EVICT_TARGET = 0.9
+
+
+def segment_key(url: str, byterange: tuple = None) -> str:
+    """
+    host(prefix) + path(uuid/rendition/segment)와 byterange로 만든 주소 기반 key.
+    query string(토큰 등)은 내용과 무관하므로 제외한다.
+    """
+    parts = urlsplit(url)
+    address = f"{parts.netloc}{parts.path}"
+    if byterange:
+        address += f"@{byterange[0]}-{byterange[1]}"
+    return hashlib.sha256(address.encode("utf-8")).hexdigest()
+
+
+class SegmentCache:
+    """
+    HLS 세그먼트 원본(복호화 전) 바이트를 key별 파일로 저장하는 디스크 캐시.
+    재시도, 재실행, 다른 audio 조합으로 같은 세그먼트를 다시 요청할 때 네트워크를 건너뛴다.
+    영상 출력이 완성되면 discard_video()로 그 영상의 세그먼트를 지우고(다시 받을 일이 없다),
+    전체 크기가 max_bytes를 넘으면 가장 오래 안 쓴 세그먼트부터 지운다.
+    파일은 임시 파일에 쓴 뒤 rename하므로 여러 worker가 같은 세그먼트를 동시에 써도 안전하다.
+    """
+
+    def __init__(self, root: str = SEGMENT_CACHE_DIR, max_bytes: int = SEGMENT_CACHE_MAX):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False, timeout=30)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS segments ("
+                " key TEXT PRIMARY KEY, size INTEGER NOT NULL, used_at REAL NOT NULL, video TEXT)"
+            )
+            columns = [row[1] for row in self._db.execute("PRAGMA table_info(segments)")]
+            if "video" not in columns:
+                self._db.execute("ALTER TABLE segments ADD COLUMN video TEXT")
+            self._db.execute("CREATE INDEX IF NOT EXISTS segments_video ON segments (video)")
+        self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM segments").fetchone()[0]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, key: str, video: str = None) -> bytes:
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        with self._lock, self._db:
+            # video를 모르던 세그먼트(preflight 등)도 이 영상 것으로 묶는다
+            self._db.execute("UPDATE segments SET used_at = ?, video = COALESCE(?, video) WHERE key = ?",
+                             (time.time(), video, key))
+        return data
+
+    def put(self, key: str, data: bytes, video: str = None) -> None:
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock, self._db:
+            row = self._db.execute("SELECT size FROM segments WHERE key = ?", (key,)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?)",
+                             (key, len(data), time.time(), video))
+            self._total += len(data) - (row[0] if row else 0)
+            if self._total > self.max_bytes:
+                self._evict_locked()
+
+    def discard_video(self, video: str) -> int:
+        """video의 세그먼트를 모두 지운다. 지운 바이트 수 반환"""
+        with self._lock, self._db:
+            rows = self._db.execute("SELECT key, size FROM segments WHERE video = ?", (video,)).fetchall()
+            for key, _ in rows:
+                self._remove_locked(key)
+            freed = sum(size for _, size in rows)
+            self._total -= freed
+        return freed
+
+    def _remove_locked(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+        self._db.execute("DELETE FROM segments WHERE key = ?", (key,))
+
+    def _evict_locked(self) -> None:
+        target = self.max_bytes * EVICT_TARGET
+        rows = self._db.execute("SELECT key, size FROM segments ORDER BY used_at").fetchall()
+        for key, size in rows:
+            if self._total <= target:
+                break
+            self._remove_locked(key)
+            self._total -= size
+
+
+_default = None
+_default_lock = threading.Lock()
+_enabled = True
+
+
+def configure_segment_cache(enabled: bool) -> None:
+    """기본 캐시 사용 여부 (끄면 HLSDownloader가 매번 네트워크에서 받는다)"""
+    global _enabled
+    _enabled = enabled
+
+
+def default_segment_cache() -> SegmentCache:
+    global _default
+    if not _enabled:
+        return None
+    with _default_lock:
+        if _default is None:
+            _default = SegmentCache()
+        return _default
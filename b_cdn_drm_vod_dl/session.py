@@ -0,0 +1,173 @@
+import json
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .ratelimit import LIMITER, THROTTLE_STATUSES
+
+# host당 keep-alive 연결 수. configure()로 worker 수에 맞춰 조정
+POOL_SIZE = 16
+# 캐시할 host별 connection pool 개수 (vz-* 5개 + API host 여유분)
+POOL_HOSTS = 16
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+# 404는 "variant 없음" 신호이므로 재시도하지 않는다.
+# 429/503은 rate limiter가 backoff 후 재시도한다 (THROTTLE_RETRIES)
+RETRY_STATUSES = (500, 502, 504)
+THROTTLE_RETRIES = 6
+
+SCRAPER_COOKIE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "pding", "cloudscraper_cookies.json")
+
+_lock = threading.Lock()
+_pool_size = POOL_SIZE
+_session = None
+_scraper = None
+_url_rewrite = None
+
+
+def _is_challenge(resp) -> bool:
+    """
+    Cloudflare challenge 응답인지. 기다려도 풀리지 않으므로 throttle로 보고 재시도하지 않고
+    바로 돌려줘 cloudscraper(또는 browser fallback)가 처리하게 한다.
+    """
+    if resp.headers.get("cf-mitigated", "").lower() == "challenge":
+        return True
+    return resp.status_code == 503 and resp.headers.get("Server", "").lower().startswith("cloudflare")
+
+
+class _Adapter(HTTPAdapter):
+    """모든 요청을 host별 rate limiter에 통과시키고, throttle 응답은 backoff 후 다시 보낸다"""
+
+    def send(self, request, **kwargs):
+        if _url_rewrite is not None:
+            request.url = _url_rewrite(request.url)
+        host = urlsplit(request.url).netloc
+        for attempt in range(THROTTLE_RETRIES + 1):
+            LIMITER.before_request(host)
+            try:
+                resp = super().send(request, **kwargs)
+            except BaseException:
+                LIMITER.after_response(host)
+                raise
+            if _is_challenge(resp):
+                # challenge는 요청 속도 신호가 아니므로 host 속도를 줄이지 않고 슬롯만 반납
+                LIMITER.after_response(host)
+                resp.throttle_retries = attempt
+                return resp
+            LIMITER.after_response(host, resp.status_code, resp.headers.get("Retry-After"))
+            if resp.status_code not in THROTTLE_STATUSES or attempt == THROTTLE_RETRIES:
+                resp.throttle_retries = attempt
+                return resp
+            resp.close()
+
+
+def set_url_rewrite(rewrite) -> None:
+    """
+    모든 요청 URL을 rewrite(url)로 바꿔 보낸다. 벤치마크에서 CDN/API host를
+    로컬 fake 서버로 돌릴 때 사용. None이면 해제.
+    """
+    global _url_rewrite
+    _url_rewrite = rewrite
+
+
+def _adapter(pool_size: int) -> HTTPAdapter:
+    retry = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        # Retry-After가 붙은 429/503은 _Adapter/rate limiter가 처리한다 (urllib3가 한 번 더 재시도하지 않게)
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    # pool_block=True: host당 pool_size 이상 동시 연결을 열지 않고 대기
+    return _Adapter(pool_connections=POOL_HOSTS, pool_maxsize=pool_size, max_retries=retry, pool_block=True)
+
+
+def _mount(session: requests.Session, pool_size: int) -> requests.Session:
+    adapter = _adapter(pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def configure(pool_size: int) -> None:
+    """host당 connection pool 크기 설정. 이미 만들어진 세션에도 새 adapter를 적용한다."""
+    global _pool_size
+    LIMITER.configure(max_active=pool_size)
+    with _lock:
+        _pool_size = max(1, pool_size)
+        if _session is not None:
+            _mount(_session, _pool_size)
+        if _scraper is not None:
+            _mount(_scraper, _pool_size)
+
+
+def get_session() -> requests.Session:
+    """프로세스 전체에서 공유하는 keep-alive 세션"""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = _mount(requests.Session(), _pool_size)
+        return _session
+
+
+def get_scraper():
+    """
+    재사용되는 cloudscraper 인스턴스. Cloudflare clearance 쿠키를
+    SCRAPER_COOKIE_FILE에서 불러와 실행 간에도 유지한다.
+    """
+    global _scraper
+    with _lock:
+        if _scraper is None:
+            import cloudscraper
+            _scraper = _mount(cloudscraper.create_scraper(), _pool_size)
+            _load_cookies(_scraper)
+        return _scraper
+
+
+def _set_cookies(session: requests.Session, cookies: list) -> None:
+    for c in cookies:
+        # 브라우저는 session 쿠키의 expires를 -1로 준다
+        expires = c.get("expires")
+        session.cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"),
+                            expires=int(expires) if expires and expires > 0 else None)
+
+
+def _load_cookies(session: requests.Session) -> None:
+    try:
+        with open(SCRAPER_COOKIE_FILE, encoding="utf-8") as f:
+            cookies = json.load(f)
+    except (OSError, ValueError):
+        return
+    _set_cookies(session, cookies)
+
+
+def import_scraper_cookies(cookies: list) -> None:
+    """
+    headless 브라우저가 challenge를 통과하고 받은 쿠키(cf_clearance 등)를 scraper에 넣는다.
+    같은 User-Agent로 보내면 이후 요청은 브라우저 없이 HTTP로 바로 통과한다.
+    """
+    scraper = get_scraper()
+    with _lock:
+        _set_cookies(scraper, cookies)
+
+
+def save_scraper_cookies() -> None:
+    """현재 scraper 쿠키(cf_clearance 등)를 디스크에 저장"""
+    with _lock:
+        if _scraper is None:
+            return
+        cookies = [
+            {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path, "expires": c.expires}
+            for c in _scraper.cookies
+        ]
+    os.makedirs(os.path.dirname(SCRAPER_COOKIE_FILE), exist_ok=True)
+    tmp = f"{SCRAPER_COOKIE_FILE}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cookies, f)
+    os.replace(tmp, SCRAPER_COOKIE_FILE)
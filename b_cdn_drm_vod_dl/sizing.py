@@ -0,0 +1,45 @@
+import m3u8
+
+from .ranged import _content_length
+from .session import get_session
+
+ESTIMATE_TIMEOUT = 5
+
+
+def _load(url: str, headers: dict) -> m3u8.M3U8:
+    resp = get_session().get(url, headers=headers, timeout=ESTIMATE_TIMEOUT)
+    resp.raise_for_status()
+    return m3u8.loads(resp.text, uri=url)
+
+
+def file_size(url: str, headers: dict) -> int:
+    """1바이트 range GET의 Content-Range/Content-Length로 본 파일 크기 (모르면 None)"""
+    return _content_length(url, headers, ESTIMATE_TIMEOUT)[0]
+
+
+def media_size(playlist: m3u8.M3U8, headers: dict) -> int:
+    """media playlist 크기: byterange가 있으면 그 합, 없으면 첫 세그먼트 크기 × 세그먼트 수"""
+    segments = playlist.segments
+    if not segments:
+        return None
+    if all(seg.byterange for seg in segments):
+        return sum(int(seg.byterange.split("@", 1)[0]) for seg in segments)
+    first = file_size(segments[0].absolute_uri, headers)
+    return first * len(segments) if first else None
+
+
+def hls_size(url: str, headers: dict) -> int:
+    """
+    playlist 하나로 예상 크기를 구한다. master면 HLSDownloader처럼 bandwidth가 가장 높은
+    variant를 골라 BANDWIDTH × 재생 시간, BANDWIDTH가 없으면 그 media playlist 기준.
+    """
+    playlist = _load(url, headers)
+    if not playlist.is_variant:
+        return media_size(playlist, headers)
+    if not playlist.playlists:
+        return None
+    best = max(playlist.playlists, key=lambda p: p.stream_info.bandwidth or 0)
+    media = _load(best.absolute_uri, headers)
+    if best.stream_info.bandwidth:
+        return int(best.stream_info.bandwidth / 8 * sum(seg.duration or 0 for seg in media.segments))
+    return media_size(media, headers)
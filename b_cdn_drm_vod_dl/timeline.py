@@ -0,0 +1,66 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+TIMELINE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pding", "candfans_timeline.sqlite3")
+TIMELINE_TTL = 7 * 24 * 3600
+TIMELINE_CACHE_MAX = 20000
+
+
+class TimelineCache:
+    """
+    candfans comment ID → get-timeline JSON 응답 원문.
+    같은 ID를 다시 조회할 때 Cloudflare를 거치는 API 호출을 건너뛴다.
+    TTL이 지난 항목은 무시하고, TIMELINE_CACHE_MAX를 넘으면 가장 오래된 항목부터 삭제한다.
+    """
+
+    def __init__(self, path: str = TIMELINE_CACHE_PATH, ttl: float = TIMELINE_TTL,
+                 max_entries: int = TIMELINE_CACHE_MAX):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS timelines ("
+                " comment_id TEXT PRIMARY KEY, body TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+
+    def get(self, comment_id: str) -> dict:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT body, fetched_at FROM timelines WHERE comment_id = ?", (comment_id,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(self, comment_id: str, data: dict) -> None:
+        body = json.dumps(data, ensure_ascii=False)
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO timelines VALUES (?, ?, ?)", (comment_id, body, time.time()))
+            self._db.execute(
+                "DELETE FROM timelines WHERE comment_id IN ("
+                " SELECT comment_id FROM timelines ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def invalidate(self, comment_id: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM timelines WHERE comment_id = ?", (comment_id,))
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_timeline_cache() -> TimelineCache:
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = TimelineCache()
+        return _default
@@ -0,0 +1,193 @@
+import http.server
+import json
+import random
+import re
+import threading
+import time
+
+CHUNK = 64 * 1024
+
+
+class FakeCDN:
+    """
+    로컬에서 vz-* Bunny CDN prefix, pd-ing 제목 API, candfans get-timeline을 흉내내는 HTTP 서버.
+    session.set_url_rewrite(cdn.rewrite)로 실제 host 대신 이 서버로 요청을 보낸다.
+
+    latency: 응답마다 추가 지연(초), bandwidth: 연결당 전송 속도 제한(bytes/s, None이면 무제한)
+    max_concurrent: 동시에 처리 중인 요청이 이보다 많으면 429 (CDN throttle 흉내, None이면 무제한)
+    stalls: 경로별 추가 지연(초). 특정 edge의 느린 세그먼트 흉내
+    """
+
+    def __init__(self, latency: float = 0.0, bandwidth: int = None, max_concurrent: int = None):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.max_concurrent = max_concurrent
+        self.files = {}
+        self.stalls = {}
+        self.active = 0
+        self._lock = threading.Lock()
+        self.reset_stats()
+        handler = type("Handler", (_Handler,), {"cdn": self})
+        self.server = _Server(("127.0.0.1", 0), handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self) -> "FakeCDN":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def rewrite(self, url: str) -> str:
+        url = re.sub(r"^https://(vz-[^./]+)\.b-cdn\.net/", rf"{self.base_url}/cdn/\1/", url)
+        url = url.replace("https://backend.prod.pd-ing.com/", f"{self.base_url}/pding/")
+        url = url.replace("https://www.pd-ing.com/", f"{self.base_url}/pding-web/")
+        url = url.replace("https://video.candfans.jp/", f"{self.base_url}/candfans-video/")
+        return url.replace("https://candfans.jp/", f"{self.base_url}/candfans/")
+
+    # --- 통계 ---
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.started_at = time.monotonic()
+            self.stats = {"requests": 0, "not_found": 0, "throttled": 0, "bytes": 0, "first_media_at": None}
+
+    def _record(self, path: str, status: int, nbytes: int) -> None:
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["bytes"] += nbytes
+            if status == 404:
+                self.stats["not_found"] += 1
+            elif status == 429:
+                self.stats["throttled"] += 1
+            media = "/cdn/" in path and not path.endswith(".m3u8")
+            if media and status in (200, 206) and nbytes > 1 and self.stats["first_media_at"] is None:
+                self.stats["first_media_at"] = time.monotonic() - self.started_at
+
+    # --- 콘텐츠 등록 ---
+
+    def add_file(self, path: str, data: bytes) -> None:
+        self.files[path] = data
+
+    def add_media_playlist(self, base: str, segments: list, init: bytes = None) -> None:
+        """base: '/cdn/{prefix}/{vid}/video/720p/video.m3u8' 같은 playlist 경로"""
+        directory = base.rsplit("/", 1)[0]
+        lines = ["#EXTM3U", "#EXT-X-VERSION:7", "#EXT-X-TARGETDURATION:4", "#EXT-X-MEDIA-SEQUENCE:0"]
+        if init is not None:
+            self.add_file(f"{directory}/init.mp4", init)
+            lines.append('#EXT-X-MAP:URI="init.mp4"')
+        for i, data in enumerate(segments):
+            self.add_file(f"{directory}/seg{i}.ts", data)
+            lines += ["#EXTINF:4.0,", f"seg{i}.ts"]
+        lines.append("#EXT-X-ENDLIST")
+        self.add_file(base, ("\n".join(lines) + "\n").encode())
+
+    def add_master_playlist(self, path: str, variants: list, audio: list = ()) -> None:
+        """variants: [(uri, width, height, bandwidth, codecs)], audio: [(name, uri)]"""
+        lines = ["#EXTM3U"]
+        for name, uri in audio:
+            lines.append(f'#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID="audio",NAME="{name}",URI="{uri}"')
+        group = ',AUDIO="audio"' if audio else ""
+        for uri, width, height, bandwidth, codecs in variants:
+            lines.append(f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={width}x{height},'
+                         f'CODECS="{codecs}"{group}')
+            lines.append(uri)
+        self.add_file(path, ("\n".join(lines) + "\n").encode())
+
+    def add_title(self, uuid: str, title: str) -> None:
+        """제목 API 응답과 영상 페이지(<title>) 둘 다 등록"""
+        self.add_file(f"/pding/api/cdn/video/{uuid}", json.dumps({"result": {"title": title}}).encode())
+        self.add_file(f"/pding-web/video?v={uuid}", f"<html><head><title>{title}</title></head></html>".encode())
+
+    def add_timeline(self, comment_id: str, user_id: int, post_id: int, video_uuid: str, title: str) -> None:
+        data = {"data": {"post": {
+            "title": title, "user_id": user_id, "post_id": post_id,
+            "contents_text": "x" * 2000,
+            "post_attachments": [{"default_path": f"{video_uuid}.m3u8"}],
+            "attachments": [{"uuid": video_uuid,
+                             "url": f"https://video.candfans.jp/user/{user_id}/post/{post_id}/{video_uuid}.m3u8"}],
+        }}}
+        self.add_file(f"/candfans/api/contents/get-timeline/{comment_id}", json.dumps(data).encode())
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    # listen backlog. 기본값 5로는 동시 probe 때 SYN 재전송으로 1초씩 지연된다
+    request_queue_size = 256
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    cdn = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        cdn = self.cdn
+        with cdn._lock:
+            cdn.active += 1
+            throttled = cdn.max_concurrent is not None and cdn.active > cdn.max_concurrent
+        try:
+            if throttled:
+                self._reply_empty(429, {"Retry-After": "1"})
+                cdn._record(self.path, 429, 0)
+            else:
+                self._serve()
+        finally:
+            with cdn._lock:
+                cdn.active -= 1
+
+    def _reply_empty(self, status: int, headers: dict = None) -> None:
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _serve(self):
+        cdn = self.cdn
+        if cdn.latency:
+            time.sleep(cdn.latency)
+        path = self.path.split("?", 1)[0]
+        if path in cdn.stalls:
+            time.sleep(cdn.stalls[path])
+        data = cdn.files.get(self.path, cdn.files.get(path))
+        if data is None:
+            self._reply_empty(404)
+            cdn._record(path, 404, 0)
+            return
+
+        status, start, end = 200, 0, len(data) - 1
+        m = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if m:
+            status, start = 206, int(m.group(1))
+            end = min(int(m.group(2)), end) if m.group(2) else end
+        body = data[start:end + 1]
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        self.end_headers()
+        try:
+            self._send(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        cdn._record(path, status, len(body))
+
+    def _send(self, body: bytes) -> None:
+        bandwidth = self.cdn.bandwidth
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+        for offset in range(0, len(body), CHUNK):
+            chunk = body[offset:offset + CHUNK]
+            self.wfile.write(chunk)
+            time.sleep(len(chunk) / bandwidth)
+
+
+def synthetic_bytes(size: int, seed: int = 0) -> bytes:
+    """seed별로 재현 가능한 의사 난수 바이트열"""
+    return random.Random(seed).randbytes(size)
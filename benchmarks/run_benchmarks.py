@@ -0,0 +1,316 @@
+"""
+실제 *.b-cdn.net / pd-ing / candfans host 없이 로컬 fake 서버로 다운로드 경로를 측정한다.
+
+    python -m benchmarks.run_benchmarks                 # 전체 시나리오
+    python -m benchmarks.run_benchmarks mp4_last_prefix --videos 20 --latency 0.05
+    python -m benchmarks.run_benchmarks --json baseline.json
+
+시나리오마다 HOME을 임시 디렉터리로 바꾼 별도 프로세스에서 실행하므로
+route/title 캐시와 전역 pool 상태가 시나리오 사이에 섞이지 않는다.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from b_cdn_drm_vod_dl.config import (ANDROID_PROFILE, PRIMARY_PREFIX, QUINARY_PREFIX, SECONDARY_PREFIX,
+                                     TERTIARY_PREFIX, WINDOWS_PROFILE)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILES = {"android": ANDROID_PROFILE, "windows": WINDOWS_PROFILE}
+RESULT_FILE = "result.json"
+
+
+def video_uuid(i: int) -> str:
+    return f"{i:08x}-0000-4000-8000-{i:012x}"
+
+
+def page_url(vid: str) -> str:
+    return f"https://www.pd-ing.com/video?v={vid}"
+
+
+def _segments(args, seed: int) -> list:
+    from benchmarks.fake_cdn import synthetic_bytes
+    return [synthetic_bytes(args.segment_size, seed * 1000 + i) for i in range(args.segments)]
+
+
+def _add_local_dir(cdn, cdn_dir: str, local_dir: str) -> None:
+    for entry in os.listdir(local_dir):
+        with open(os.path.join(local_dir, entry), "rb") as f:
+            cdn.add_file(f"{cdn_dir}/{entry}", f.read())
+
+
+def _ffmpeg_renditions(work_dir: str, seconds: int) -> tuple:
+    """ffmpeg로 실제 mux 가능한 video-only / audio-only HLS를 만든다"""
+    video_dir, audio_dir = os.path.join(work_dir, "v"), os.path.join(work_dir, "a")
+    os.makedirs(video_dir)
+    os.makedirs(audio_dir)
+    hls = ["-f", "hls", "-hls_time", "2", "-hls_playlist_type", "vod"]
+    subprocess.run([
+        "ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", f"testsrc=duration={seconds}:size=640x360:rate=25",
+        "-c:v", "libx264", "-pix_fmt", "yuv420p", *hls,
+        "-hls_segment_filename", os.path.join(video_dir, "seg%d.ts"), os.path.join(video_dir, "video.m3u8"),
+    ], check=True)
+    subprocess.run([
+        "ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", f"sine=duration={seconds}",
+        "-c:a", "aac", *hls,
+        "-hls_segment_filename", os.path.join(audio_dir, "seg%d.ts"), os.path.join(audio_dir, "audio.m3u8"),
+    ], check=True)
+    return video_dir, audio_dir
+
+
+# --- 시나리오: setup(cdn, app, args, work_dir) -> work() 를 반환 ---
+
+def setup_hls_primary(cdn, app, args, work_dir):
+    """PRIMARY prefix playlist.m3u8에 있는 영상 배치 (engine + 제목 API 포함)"""
+    from b_cdn_drm_vod_dl.engine import DownloadEngine
+    urls = []
+    for i in range(args.videos):
+        vid = video_uuid(i)
+        cdn.add_title(vid, f"PD | hls {i}")
+        cdn.add_media_playlist(f"/cdn/{PRIMARY_PREFIX}/{vid}/playlist.m3u8", _segments(args, i))
+        urls.append(page_url(vid))
+    return lambda: DownloadEngine(max_jobs=args.jobs).run_batch(urls, app.build_video_info, app.download_video)
+
+
+def setup_hls_rerun(cdn, app, args, work_dir):
+    """
+    hls_primary가 마지막 이동 단계에서 실패한 뒤 재실행: segment cache 재사용 측정
+    (완성된 영상의 세그먼트는 캐시에서 지워지므로 실패한 시도 다음의 재실행만 캐시를 쓴다)
+    """
+    work = setup_hls_primary(cdn, app, args, work_dir)
+
+    def fail_move(src, name):
+        raise OSError("benchmark: simulated failure before the output is moved")
+
+    app.move_to_output = fail_move
+    work()
+    del app.move_to_output
+    shutil.rmtree(app.profile.output_dir, ignore_errors=True)
+    return work
+
+
+def setup_hls_mirrors(cdn, app, args, work_dir):
+    """PRIMARY/SECONDARY 둘 다 같은 playlist, PRIMARY에서 영상마다 세그먼트 하나가 멈춤: hedge/mirror 분산 측정"""
+    from b_cdn_drm_vod_dl.engine import DownloadEngine
+    urls = []
+    for i in range(args.videos):
+        vid = video_uuid(i)
+        cdn.add_title(vid, f"PD | mirrors {i}")
+        for prefix in (PRIMARY_PREFIX, SECONDARY_PREFIX):
+            cdn.add_media_playlist(f"/cdn/{prefix}/{vid}/playlist.m3u8", _segments(args, i))
+        cdn.stalls[f"/cdn/{PRIMARY_PREFIX}/{vid}/seg{args.segments // 2}.ts"] = args.stall
+        urls.append(page_url(vid))
+    return lambda: DownloadEngine(max_jobs=args.jobs).run_batch(urls, app.build_video_info, app.download_video)
+
+
+def setup_mp4_last_prefix(cdn, app, args, work_dir):
+    """마지막 prefix(QUINARY)에만 play_480p.mp4가 있는 배치: prefix 탐색 비용 측정"""
+    from b_cdn_drm_vod_dl.engine import DownloadEngine
+    from benchmarks.fake_cdn import synthetic_bytes
+    urls = []
+    for i in range(args.videos):
+        vid = video_uuid(i)
+        cdn.add_title(vid, f"PD | mp4 {i}")
+        cdn.add_file(f"/cdn/{QUINARY_PREFIX}/{vid}/play_480p.mp4",
+                     synthetic_bytes(args.segment_size * args.segments, i))
+        urls.append(page_url(vid))
+    return lambda: DownloadEngine(max_jobs=args.jobs).run_batch(urls, app.build_video_info, app.download_video)
+
+
+def setup_mp4_cached_route(cdn, app, args, work_dir):
+    """mp4_last_prefix를 한 번 돌려 route 캐시를 채운 뒤 재실행"""
+    work = setup_mp4_last_prefix(cdn, app, args, work_dir)
+    work()
+    shutil.rmtree(app.profile.output_dir, ignore_errors=True)
+    return work
+
+
+def _setup_advanced(cdn, app, args, work_dir, master: bool):
+    video_dir, audio_dir = _ffmpeg_renditions(work_dir, args.seconds)
+    infos = []
+    for i in range(args.videos):
+        vid = video_uuid(i)
+        base = f"/cdn/{TERTIARY_PREFIX}/{vid}"
+        _add_local_dir(cdn, f"{base}/video/720p", video_dir)
+        _add_local_dir(cdn, f"{base}/audio/128a", audio_dir)
+        if master:
+            cdn.add_master_playlist(f"{base}/playlist.m3u8",
+                                    [("video/720p/video.m3u8", 1280, 720, 2500000, "avc1.64001f,mp4a.40.2")],
+                                    [("128a", "audio/128a/audio.m3u8")])
+        infos.append({"referer": page_url(vid), "video_id": vid, "name": f"advanced {i}"})
+
+    def work():
+        return [{"success": bool(app.download_advanced(info, TERTIARY_PREFIX))} for info in infos]
+    return work
+
+
+def setup_advanced_master(cdn, app, args, work_dir):
+    """TERTIARY master playlist에서 rendition을 골라 video+audio mux (ffmpeg 필요)"""
+    return _setup_advanced(cdn, app, args, work_dir, master=True)
+
+
+def setup_advanced_loop(cdn, app, args, work_dir):
+    """master playlist 없이 해상도/음질 반복 탐색 후 mux (ffmpeg 필요)"""
+    return _setup_advanced(cdn, app, args, work_dir, master=False)
+
+
+def setup_candfans_timeline(cdn, app, args, work_dir):
+    """candfans get-timeline 조회 + m3u8 링크 추출"""
+    import candfans
+    ids = [str(900000 + i) for i in range(args.videos)]
+    for i, cid in enumerate(ids):
+        cdn.add_timeline(cid, 1000 + i, 5000 + i, video_uuid(i), f"candfans {i}")
+
+    def work():
+        results = []
+        for cid in ids:
+            try:
+                candfans.extract_title_and_link(candfans.fetch_timeline(cid))
+                results.append({"success": True})
+            except Exception:
+                results.append({"success": False})
+        return results
+    return work
+
+
+def setup_candfans_batch(cdn, app, args, work_dir):
+    """candfans resolve_batch: worker pool로 동시 조회 (timeline 캐시 cold)"""
+    import candfans
+    ids = [str(900000 + i) for i in range(args.videos)]
+    for i, cid in enumerate(ids):
+        cdn.add_timeline(cid, 1000 + i, 5000 + i, video_uuid(i), f"candfans {i}")
+    return lambda: [{"success": r["m3u8"] is not None} for r in candfans.resolve_batch(ids)]
+
+
+SCENARIOS = {
+    "hls_primary": (setup_hls_primary, False),
+    "hls_rerun": (setup_hls_rerun, False),
+    "hls_mirrors": (setup_hls_mirrors, False),
+    "mp4_last_prefix": (setup_mp4_last_prefix, False),
+    "mp4_cached_route": (setup_mp4_cached_route, False),
+    "advanced_master": (setup_advanced_master, True),
+    "advanced_loop": (setup_advanced_loop, True),
+    "candfans_timeline": (setup_candfans_timeline, False),
+    "candfans_batch": (setup_candfans_batch, False),
+}
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+
+def run_child(name: str, args) -> dict:
+    """HOME이 임시 디렉터리인 자식 프로세스 안에서 시나리오 하나를 실행"""
+    from b_cdn_drm_vod_dl.core import Pipeline
+    from b_cdn_drm_vod_dl.session import set_url_rewrite
+    from benchmarks.fake_cdn import FakeCDN
+
+    work_dir = os.environ["HOME"]
+    app = Pipeline(PROFILES[args.profile].with_overrides(
+        temp_dir=os.path.join(work_dir, "temp"), output_dir=os.path.join(work_dir, "out"),
+    ))
+    cdn = FakeCDN(latency=args.latency, bandwidth=args.bandwidth, max_concurrent=args.cdn_max_concurrent).start()
+    set_url_rewrite(cdn.rewrite)
+    try:
+        work = SCENARIOS[name][0](cdn, app, args, work_dir)
+        cdn.reset_stats()
+        start = time.monotonic()
+        results = work()
+        elapsed = time.monotonic() - start
+    finally:
+        cdn.stop()
+    output = _dir_size(app.profile.output_dir)
+    return {
+        "scenario": name,
+        "ok": sum(1 for r in results if r["success"]),
+        "total": len(results),
+        "elapsed_s": round(elapsed, 3),
+        "ttfb_s": round(cdn.stats["first_media_at"], 3) if cdn.stats["first_media_at"] is not None else None,
+        "served_mb": round(cdn.stats["bytes"] / 1e6, 2),
+        "output_mb": round(output / 1e6, 2),
+        "mb_per_s": round(output / 1e6 / elapsed, 2) if elapsed else 0.0,
+        "requests": cdn.stats["requests"],
+        "wasted_requests": cdn.stats["not_found"],
+        "throttled": cdn.stats["throttled"],
+    }
+
+
+def run_isolated(name: str, argv: list) -> dict:
+    with tempfile.TemporaryDirectory(prefix=f"bench-{name}-") as home:
+        env = dict(os.environ, HOME=home, USERPROFILE=home)
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.run_benchmarks", "--child", name, *argv],
+            cwd=ROOT, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            return {"scenario": name, "error": (proc.stderr.strip().splitlines() or ["failed"])[-1]}
+        with open(os.path.join(home, RESULT_FILE), encoding="utf-8") as f:
+            return json.load(f)
+
+
+def print_table(rows: list) -> None:
+    columns = ("scenario", "ok", "total", "elapsed_s", "ttfb_s", "output_mb", "mb_per_s",
+               "requests", "wasted_requests", "throttled", "error")
+    columns = [c for c in columns if any(c in r for r in rows)]
+    widths = {c: max(len(c), *(len(str(r.get(c, ""))) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for r in rows:
+        print("  ".join(str(r.get(c, "")).ljust(widths[c]) for c in columns))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks against a local fake Bunny CDN")
+    parser.add_argument("scenarios", nargs="*", help=f"실행할 시나리오 (기본: 전체) {', '.join(SCENARIOS)}")
+    parser.add_argument("--videos", type=int, default=6, help="시나리오당 영상/ID 수")
+    parser.add_argument("--jobs", type=int, default=3, help="DownloadEngine 동시 영상 수")
+    parser.add_argument("--segments", type=int, default=20, help="영상당 세그먼트 수")
+    parser.add_argument("--segment-size", type=int, default=256 * 1024, help="세그먼트 크기 (bytes)")
+    parser.add_argument("--seconds", type=int, default=8, help="ffmpeg 시나리오 영상 길이")
+    parser.add_argument("--latency", type=float, default=0.02, help="응답당 지연 (초)")
+    parser.add_argument("--stall", type=float, default=3.0, help="hls_mirrors: 멈춘 세그먼트의 추가 지연 (초)")
+    parser.add_argument("--bandwidth", type=int, default=None, help="연결당 전송 제한 (bytes/s)")
+    parser.add_argument("--cdn-max-concurrent", type=int, default=None,
+                        help="fake CDN이 동시에 처리하는 요청 수 (넘으면 429)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="android",
+                        help="다운로드 설정 (run.py/auto.py = android, win.py = windows)")
+    parser.add_argument("--json", metavar="FILE", help="결과를 JSON으로 저장 (회귀 비교용 baseline)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        # 다운로드 코드가 stdout에 진행 로그를 찍으므로 결과는 파일로 넘긴다
+        result = run_child(args.child, args)
+        with open(os.path.join(os.environ["HOME"], RESULT_FILE), "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        sys.exit(f"unknown scenario: {', '.join(unknown)}")
+    passthrough = [a for a in sys.argv[1:] if a not in names]
+    rows = []
+    for name in names:
+        if SCENARIOS[name][1] and not shutil.which("ffmpeg"):
+            rows.append({"scenario": name, "error": "skipped: ffmpeg not found"})
+            continue
+        rows.append(run_isolated(name, passthrough))
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
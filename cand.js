@@ -1,17 +1,108 @@
 // cand.js
+//
+//   node cand.js 968402
+//     get-timeline/968402 한 번 조회해서 JSON 출력
+//
+//   node cand.js --serve [--pages 2] [--user-agent UA] [--timeout 45000]
+//     브라우저를 띄워 둔 채 stdin으로 {"id", "url", "referer"} JSON을 한 줄씩 받고
+//     {"id", "status", "body", "cookies"} 또는 {"id", "error"}를 stdout에 한 줄씩 돌려준다.
+//     page들은 같은 context를 쓰므로 한 번 통과한 Cloudflare clearance 쿠키를 같이 쓴다.
+//     (candfans.py가 b_cdn_drm_vod_dl/browser_pool.py로 띄우는 worker)
 const puppeteer = require('puppeteer');
+const readline = require('readline');
 
-(async () => {
+const DEFAULT_USER_AGENT =
+  'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36';
+
+function option(args, name, fallback) {
+  const i = args.indexOf(name);
+  return i >= 0 && i + 1 < args.length ? args[i + 1] : fallback;
+}
+
+// challenge 페이지면 통과해서 API 응답(JSON)으로 바뀔 때까지 기다린다
+async function fetchPage(page, url, referer, timeout) {
+  const deadline = Date.now() + timeout;
+  let response = await page.goto(url, { waitUntil: 'networkidle2', timeout, referer });
+  for (;;) {
+    const body = await page.evaluate(() => document.body ? document.body.innerText : '');
+    try {
+      JSON.parse(body);
+      return { status: response ? response.status() : 0, body };
+    } catch (e) {
+      if (Date.now() >= deadline) {
+        throw new Error(`no JSON response (HTTP ${response ? response.status() : 0})`);
+      }
+    }
+    response = (await page.waitForNavigation({
+      waitUntil: 'networkidle2', timeout: Math.max(1000, deadline - Date.now()),
+    }).catch(() => null)) || response;
+  }
+}
+
+async function serve(args) {
+  const pages = Math.max(1, parseInt(option(args, '--pages', '2'), 10));
+  const userAgent = option(args, '--user-agent', DEFAULT_USER_AGENT);
+  const timeout = parseInt(option(args, '--timeout', '45000'), 10);
   const browser = await puppeteer.launch({ args: ['--no-sandbox'] });
-  const page = await browser.newPage();
-  await page.setUserAgent(
-    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:71.0) Gecko/20100101 Firefox/71.0'
-  );
-  // Referer 헤더가 필요하면 page.setExtraHTTPHeaders로 추가 가능
-  await page.goto('https://candfans.jp/api/contents/get-timeline/968402', {
-    waitUntil: 'networkidle2',
+  const idle = [];
+  for (let i = 0; i < pages; i++) {
+    const page = await browser.newPage();
+    await page.setUserAgent(userAgent);
+    idle.push(page);
+  }
+  const queue = [];
+  const write = (msg) => process.stdout.write(JSON.stringify(msg) + '\n');
+
+  const next = () => {
+    while (idle.length && queue.length) {
+      const page = idle.pop();
+      const req = queue.shift();
+      fetchPage(page, req.url, req.referer, timeout)
+        .then(async (res) => {
+          const cookies = await page.cookies(req.url);
+          write({ id: req.id, status: res.status, body: res.body, cookies });
+        })
+        .catch((e) => write({ id: req.id, error: String(e && e.message || e) }))
+        .finally(() => {
+          idle.push(page);
+          next();
+        });
+    }
+  };
+
+  const rl = readline.createInterface({ input: process.stdin });
+  rl.on('line', (line) => {
+    if (!line.trim()) return;
+    try {
+      queue.push(JSON.parse(line));
+    } catch (e) {
+      write({ id: null, error: `invalid request: ${e.message}` });
+      return;
+    }
+    next();
   });
-  const content = await page.evaluate(() => document.querySelector("body").innerText);
-  console.log(JSON.parse(content));
-  await browser.close();
-})();
+  rl.on('close', async () => {
+    await browser.close();
+    process.exit(0);
+  });
+  write({ id: null, ready: true, userAgent });
+}
+
+async function once(commentId) {
+  const browser = await puppeteer.launch({ args: ['--no-sandbox'] });
+  try {
+    const page = await browser.newPage();
+    await page.setUserAgent(DEFAULT_USER_AGENT);
+    const res = await fetchPage(page, `https://candfans.jp/api/contents/get-timeline/${commentId}`,
+      `https://candfans.jp/posts/comment/show/${commentId}`, 45000);
+    console.log(JSON.parse(res.body));
+  } finally {
+    await browser.close();
+  }
+}
+
+const args = process.argv.slice(2);
+(args.includes('--serve') ? serve(args) : once(args[0] || '968402')).catch((e) => {
+  console.error(e);
+  process.exit(1);
+});
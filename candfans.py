@@ -1,23 +1,117 @@
 #!/usr/bin/env python3
+import argparse
 import json
+import os
 import re
-import cloudscraper
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
-def fetch_timeline(comment_id: str) -> dict:
+from b_cdn_drm_vod_dl import BunnyVideoDRM
+from b_cdn_drm_vod_dl.browser_pool import BROWSER_PAGES, BrowserError, get_browser_pool
+from b_cdn_drm_vod_dl.daemon import DEFAULT_ADDRESS, JobServer, serve
+from b_cdn_drm_vod_dl.engine import DownloadEngine
+from b_cdn_drm_vod_dl.jobs import JobStore
+from b_cdn_drm_vod_dl.naming import NAMES, owned_by, record_owner, sanitize_filename
+from b_cdn_drm_vod_dl.segcache import default_segment_cache
+from b_cdn_drm_vod_dl.session import get_scraper, import_scraper_cookies, save_scraper_cookies
+from b_cdn_drm_vod_dl.timeline import default_timeline_cache
+
+# 동시에 조회할 comment ID 수
+BATCH_WORKERS = 6
+# 동시에 다운로드할 영상 수
+MAX_JOBS = 3
+DOWNLOAD_DIR = "/storage/emulated/0/Download"
+# 상주 모드 작업 상태 (pd-ing run.py의 jobs.sqlite3와 분리)
+CANDFANS_JOBS_DB = os.path.join(os.path.expanduser("~"), ".cache", "pding", "candfans_jobs.sqlite3")
+# video.candfans.jp는 candfans.jp에서 재생될 때의 Referer를 요구한다
+CANDFANS_REFERER = "https://candfans.jp/"
+# cloudscraper와 브라우저 fallback이 같은 User-Agent를 써야 cf_clearance 쿠키를 같이 쓸 수 있다
+CANDFANS_USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                       "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+# cloudscraper가 challenge를 못 넘을 때 쓰는 headless 브라우저 worker (node + puppeteer)
+BROWSER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cand.js")
+# 브라우저로 다시 시도할 실패: Cloudflare 차단/challenge 응답, 또는 응답 없이 난 cloudscraper 오류(None)
+BROWSER_FALLBACK_STATUSES = (None, 403, 429, 503)
+M3U8_PATTERN = re.compile(r'https://video\.candfans\.jp/user/\d+/post/\d+/[0-9a-fA-F\-]+\.m3u8')
+
+# 브라우저 fallback page 수. 0이면 cloudscraper 실패를 그대로 돌려준다 (--browser-pages)
+browser_pages = BROWSER_PAGES
+
+def timeline_url(comment_id: str) -> str:
+    return f"https://candfans.jp/api/contents/get-timeline/{comment_id}"
+
+def comment_referer(comment_id: str) -> str:
+    return f"https://candfans.jp/posts/comment/show/{comment_id}"
+
+def fetch_timeline(comment_id: str, refresh: bool = False, save_cookies: bool = True) -> dict:
+    """
+    공유 cloudscraper 인스턴스로 get-timeline API 호출 (clearance 쿠키 재사용).
+    응답은 comment ID별로 디스크에 캐시하고, refresh=True면 캐시를 무시한다.
+    cloudscraper가 막히면 상주 브라우저 pool(fetch_timeline_browser)로 다시 시도한다.
+    """
+    cache = default_timeline_cache()
+    if not refresh:
+        data = cache.get(comment_id)
+        if data is not None:
+            return data
+    headers = {"Referer": comment_referer(comment_id), "User-Agent": CANDFANS_USER_AGENT}
+    try:
+        resp = get_scraper().get(timeline_url(comment_id), headers=headers, timeout=15)
+        resp.raise_for_status()
+        data = resp.json()
+    except Exception as e:
+        # 없는 글(404 등)은 브라우저로 열어도 같으므로 challenge로 보이는 실패만 넘긴다
+        status = getattr(getattr(e, "response", None), "status_code", None)
+        if not browser_pages or status not in BROWSER_FALLBACK_STATUSES:
+            raise
+        try:
+            return fetch_timeline_browser(comment_id, refresh=True, save_cookies=save_cookies)
+        except BrowserError as browser_error:
+            raise e from browser_error
+    cache.put(comment_id, data)
+    if save_cookies:
+        save_scraper_cookies()
+    return data
+
+def fetch_timeline_browser(comment_id: str, refresh: bool = False, save_cookies: bool = True) -> dict:
+    """
+    fetch_timeline과 같은 형태로, 띄워 둔 headless 브라우저(cand.js --serve)를 거쳐 조회한다.
+    브라우저가 받은 clearance 쿠키는 scraper에 넘겨 다음 요청부터는 다시 HTTP로 바로 보낸다.
+    """
+    cache = default_timeline_cache()
+    if not refresh:
+        data = cache.get(comment_id)
+        if data is not None:
+            return data
+    pool = get_browser_pool(BROWSER_SCRIPT, pages=browser_pages or BROWSER_PAGES, user_agent=CANDFANS_USER_AGENT)
+    res = pool.fetch(timeline_url(comment_id), referer=comment_referer(comment_id))
+    import_scraper_cookies(res.get("cookies") or [])
+    if res.get("status", 0) >= 400:
+        raise BrowserError(f"HTTP {res['status']} from {timeline_url(comment_id)}")
+    data = json.loads(res["body"])
+    cache.put(comment_id, data)
+    if save_cookies:
+        save_scraper_cookies()
+    return data
+
+def find_m3u8(obj):
     """
-    cloudscraper로 get-timeline API 호출
+    파싱된 JSON 구조를 직접 순회하며 첫 video.candfans.jp m3u8 URL을 찾는다.
+    순회 순서는 json.dumps 직렬화 순서(키 삽입 순서, 깊이 우선)와 같다.
     """
-    url = f"https://candfans.jp/api/contents/get-timeline/{comment_id}"
-    scraper = cloudscraper.create_scraper()
-    headers = {
-        "Referer": f"https://candfans.jp/posts/comment/show/{comment_id}",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
-    }
-    resp = scraper.get(url, headers=headers, timeout=15)
-    resp.raise_for_status()
-    return resp.json()
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            match = M3U8_PATTERN.search(node)
+            if match:
+                return match.group(0)
+        elif isinstance(node, dict):
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return None
 
 def extract_title_and_link(data: dict) -> tuple:
     """
@@ -25,12 +119,9 @@ def extract_title_and_link(data: dict) -> tuple:
     """
     post = data.get("data", {}).get("post", {})
     title = post.get("title") or ""
-    blob = json.dumps(data)
-    match = re.search(
-        r'https://video\.candfans\.jp/user/\d+/post/\d+/[0-9a-fA-F\-]+\.m3u8', blob
-    )
-    if match:
-        return title, match.group(0)
+    link = find_m3u8(data)
+    if link:
+        return title, link
 
     user_id = post.get("user_id")
     post_id = post.get("post_id")
@@ -65,46 +156,184 @@ def parse_comment_id(arg: str) -> str:
         return m.group(1)
     raise ValueError(f"유효한 comment_id를 찾을 수 없습니다: {arg}")
 
+def resolve_one(comment_id: str, refresh: bool = False) -> dict:
+    """comment_id 하나를 {"id", "title", "m3u8", "error"}로 변환 (예외 대신 error 필드)"""
+    result = {"id": comment_id, "title": None, "m3u8": None, "error": None}
+    try:
+        data = fetch_timeline(comment_id, refresh=refresh, save_cookies=False)
+    except Exception as e:
+        result["error"] = f"API 호출 실패: {e}"
+        return result
+    try:
+        result["title"], result["m3u8"] = extract_title_and_link(data)
+    except Exception as e:
+        result["error"] = f"링크 생성 실패: {e}"
+    return result
+
+def resolve_batch(comment_ids: list, workers: int = BATCH_WORKERS, refresh: bool = False) -> list:
+    """
+    여러 comment ID를 bounded worker pool로 동시에 조회한다. 결과는 입력 순서대로.
+    clearance 쿠키는 배치가 끝난 뒤 한 번만 저장한다.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(lambda cid: resolve_one(cid, refresh), comment_ids))
+    save_scraper_cookies()
+    return results
+
+def build_download_info(comment_id: str, refresh: bool = False, output_dir: str = None) -> dict:
+    """resolve 결과를 다운로드 단계 입력으로 변환. 링크를 못 찾으면 예외"""
+    result = resolve_one(comment_id, refresh)
+    if result["error"]:
+        print(f"[{comment_id}] {result['error']}")
+        raise ValueError(result["error"])
+    name = sanitize_filename(result["title"].strip()) if result["title"] and result["title"].strip() else ""
+    # 제목이 같은 다른 글(동시에 받는 것, output_dir에 이미 받아 둔 것)과 겹치지 않도록 이름 예약
+    return dict(result, name=NAMES.claim(name or f"candfans_{comment_id}", comment_id, output_dir))
+
+def download_resolved(info: dict, output_dir: str) -> dict:
+    """resolve된 m3u8을 BunnyVideoDRM으로 받는다. 같은 글을 이미 받아 둔 파일이 있으면 건너뛴다"""
+    output_path = os.path.join(output_dir, f"{info['name']}.mp4")
+    # candfans m3u8 경로(/user/<uid>/post/<pid>/...)로는 글을 구분할 수 없으므로 comment id로 묶는다
+    video_key = f"candfans-{info['id']}"
+    try:
+        if owned_by(output_path, info["id"]):
+            print(f"[SKIP] Already downloaded: {output_path}")
+        else:
+            BunnyVideoDRM(referer=CANDFANS_REFERER, m3u8_url=info["m3u8"], name=info["name"],
+                          path=output_dir, video_key=video_key).download()
+            if os.path.exists(output_path):
+                record_owner(output_path, info["id"])
+                cache = default_segment_cache()
+                if cache:
+                    cache.discard_video(video_key)
+    finally:
+        NAMES.release(info["name"], info["id"])
+    return {"id": info["id"], "name": info["name"], "title": info["title"], "m3u8": info["m3u8"],
+            "success": os.path.exists(output_path), "source": info["m3u8"]}
+
+def download_batch(comment_ids: list, output_dir: str = DOWNLOAD_DIR, max_jobs: int = MAX_JOBS,
+                   workers: int = BATCH_WORKERS, refresh: bool = False) -> list:
+    """
+    resolve → download를 한 파이프라인으로 실행한다. 링크가 하나 resolve되는 즉시 다운로드가
+    시작되고, 조회는 workers개, 다운로드는 max_jobs개까지 동시에 진행한다.
+    """
+    engine = DownloadEngine(max_jobs=max_jobs, metadata_concurrency=workers)
+    results = engine.run_batch(
+        comment_ids,
+        lambda cid: build_download_info(cid, refresh, output_dir),
+        lambda info: download_resolved(info, output_dir),
+    )
+    save_scraper_cookies()
+    order = {cid: i for i, cid in enumerate(comment_ids)}
+    # engine은 resolve 실패 시 {"name": comment_id, ...}만 돌려준다
+    return sorted(results, key=lambda r: order.get(r.get("id", r["name"]), len(order)))
+
+def serve_downloads(address: str, output_dir: str = DOWNLOAD_DIR, max_jobs: int = MAX_JOBS,
+                    workers: int = BATCH_WORKERS, db: str = CANDFANS_JOBS_DB) -> None:
+    """
+    상주 모드: comment URL/ID를 HTTP/Unix socket API로 받아 resolve → download 한다.
+    scraper(Cloudflare cookie), timeline 캐시, connection pool이 요청 사이에 유지된다.
+    """
+    def build(arg):
+        comment_id = parse_comment_id(arg)
+        info = build_download_info(comment_id, output_dir=output_dir)
+        save_scraper_cookies()
+        return dict(info, video_id=comment_id, referer=arg)
+
+    def job_key(arg):
+        try:
+            return parse_comment_id(arg)
+        except ValueError:
+            return None
+
+    jobs = JobServer(
+        JobStore(db), DownloadEngine(max_jobs=max_jobs, metadata_concurrency=workers), build,
+        lambda info: download_resolved(info, output_dir),
+        lambda info: os.path.join(output_dir, f"{info['name']}.mp4"),
+        job_key=job_key,
+    )
+    try:
+        serve(jobs, address)
+    finally:
+        save_scraper_cookies()
+
+def copy_to_clipboard(text: str, label: str) -> None:
+    try:
+        subprocess.run(["termux-clipboard-set", text], check=True)
+        print(f"Last {label} copied to clipboard: {text}")
+    except Exception as e:
+        print(f"Failed to copy {label}: {e}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Resolve candfans comment URLs/IDs to m3u8 links")
+    parser.add_argument("ids", nargs="*", help="comment URL 또는 ID (없으면 입력 프롬프트)")
+    parser.add_argument("-j", "--workers", type=int, default=BATCH_WORKERS, help="동시 조회 수")
+    parser.add_argument("--json", metavar="FILE", help="[{id, title, m3u8, error}] 결과를 JSON으로 저장 ('-'면 stdout)")
+    parser.add_argument("--refresh", action="store_true", help="timeline 캐시를 무시하고 다시 조회")
+    parser.add_argument("-d", "--download", action="store_true",
+                        help="resolve한 링크를 바로 다운로드 (클립보드 복사 없음)")
+    parser.add_argument("-o", "--output", default=DOWNLOAD_DIR, help=f"다운로드 폴더 (기본: {DOWNLOAD_DIR})")
+    parser.add_argument("--jobs", type=int, default=MAX_JOBS, help="동시 다운로드 영상 수")
+    parser.add_argument("--no-clipboard", action="store_true", help="마지막 링크/제목을 클립보드에 복사하지 않음")
+    parser.add_argument("--serve", metavar="ADDR", nargs="?", const=DEFAULT_ADDRESS,
+                        help=f"상주 모드: HOST:PORT 또는 Unix socket 경로로 다운로드 작업 API 제공 (기본: {DEFAULT_ADDRESS})")
+    parser.add_argument("--db", default=CANDFANS_JOBS_DB, help="상주 모드 작업 상태 SQLite 경로")
+    parser.add_argument("--browser-pages", type=int, default=BROWSER_PAGES,
+                        help=f"cloudscraper가 막힐 때 쓰는 headless 브라우저 page 수 (0이면 안 씀, 기본: {BROWSER_PAGES})")
+    return parser.parse_args()
+
 def main():
-    raw = input("Enter comment URLs or IDs (separated by space): ")
-    args = raw.strip().split()
-    if not args:
+    global browser_pages
+    args = parse_args()
+    browser_pages = args.browser_pages
+    if args.serve:
+        serve_downloads(args.serve, args.output, max_jobs=args.jobs, workers=args.workers, db=args.db)
+        return
+    raw_ids = args.ids
+    if not raw_ids:
+        raw_ids = input("Enter comment URLs or IDs (separated by space): ").strip().split()
+    if not raw_ids:
         print("No input provided.")
         sys.exit(1)
-    last_title = None
-    last_link = None
-    for arg in args:
+    comment_ids = []
+    for arg in raw_ids:
         try:
-            cid = parse_comment_id(arg)
+            comment_ids.append(parse_comment_id(arg))
         except Exception as e:
             print(f"[ERROR] ID 파싱 실패 '{arg}': {e}")
-            continue
-        try:
-            data = fetch_timeline(cid)
-        except Exception as e:
-            print(f"[{cid}] API 호출 실패: {e}")
-            continue
-        try:
-            title, link = extract_title_and_link(data)
-        except Exception as e:
-            print(f"[{cid}] 링크 생성 실패: {e}")
-            continue
-        print(f"Link: {link}")
-        print(f"Title: {title}\n")
-        last_title = title
-        last_link = link
-    if last_link:
-        try:
-            subprocess.run(["termux-clipboard-set", last_link], check=True)
-            print(f"Last link copied to clipboard: {last_link}")
-        except Exception as e:
-            print(f"Failed to copy link: {e}")
-    if last_title:
-        try:
-            subprocess.run(["termux-clipboard-set", last_title], check=True)
-            print(f"Last title copied to clipboard: {last_title}")
-        except Exception as e:
-            print(f"Failed to copy title: {e}")
+
+    if args.download:
+        results = download_batch(comment_ids, args.output, max_jobs=args.jobs,
+                                 workers=args.workers, refresh=args.refresh)
+        print("\n=== Results ===")
+        for r in results:
+            print(f"[{'OK' if r['success'] else 'FAIL'}] {r['name']}")
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+        sys.exit(0 if all(r["success"] for r in results) else 1)
+
+    results = resolve_batch(comment_ids, workers=args.workers, refresh=args.refresh)
+    if args.json == "-":
+        json.dump(results, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        for r in results:
+            if r["error"]:
+                print(f"[{r['id']}] {r['error']}")
+                continue
+            print(f"Link: {r['m3u8']}")
+            print(f"Title: {r['title']}\n")
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            print(f"Results saved to {args.json}")
+
+    resolved = [r for r in results if r["m3u8"]]
+    if resolved and not args.no_clipboard and args.json != "-":
+        copy_to_clipboard(resolved[-1]["m3u8"], "link")
+        if resolved[-1]["title"]:
+            copy_to_clipboard(resolved[-1]["title"], "title")
 
 if __name__ == "__main__":
     main()